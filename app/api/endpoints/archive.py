@@ -0,0 +1,58 @@
+from fastapi import APIRouter, HTTPException, Path, Query
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+import logging
+
+from app.core.config import settings
+from app.models.schemas import ProductResponse, ProductVariant
+from app.services.archive import page_archive, reextract
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix='/archive')
+
+def _require_archive():
+    if not settings.ARCHIVE_ENABLED:
+        raise HTTPException(status_code=404, detail="Page archive is disabled")
+
+@router.get("/stats")
+async def get_archive_stats():
+    """Page and blob counts of the page archive."""
+    _require_archive()
+    return await run_in_threadpool(page_archive.stats)
+
+@router.get("/{product_id}", response_model=ProductResponse)
+async def list_archived_pages(
+    product_id: int = Path(..., description="The product ID from 1688.com"),
+    variant: Optional[ProductVariant] = Query(None, description="Only list pages of this variant"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """List the archived fetches of a product, oldest first."""
+    _require_archive()
+    pages = await run_in_threadpool(
+        lambda: list(page_archive.pages(product_id, variant.value if variant else None, limit=limit))
+    )
+    return {"code": 200, "msg": "success", "data": {"pages": pages}}
+
+@router.post("/{product_id}/reextract", response_model=ProductResponse)
+async def reextract_product(
+    product_id: int = Path(..., description="The product ID from 1688.com"),
+    variant: Optional[ProductVariant] = Query(None, description="Only re-extract this variant")
+):
+    """
+    Run the current extractor over the latest archived page of each variant.
+    
+    Bulk re-extraction is done offline with `python -m app.services.archive reextract`.
+    """
+    _require_archive()
+    
+    def run():
+        rows = list(page_archive.pages(product_id, variant.value if variant else None, latest_only=True))
+        return list(reextract(rows, workers=1))
+    
+    results = await run_in_threadpool(run)
+    if not results:
+        raise HTTPException(status_code=404, detail="No archived pages for this product")
+    data = {result["variant"]: result["data"] for result in results if result["data"] is not None}
+    if not data:
+        raise HTTPException(status_code=404, detail="Could not extract data from the archived pages")
+    return {"code": 200, "msg": "success", "data": data}
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, Path
+from starlette.concurrency import run_in_threadpool
+import logging
+
+from app.models.schemas import JobRequest, JobResponse
+from app.services.jobs import check_callback_url, job_store
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix='/jobs')
+
+@router.post("", response_model=JobResponse, status_code=202)
+async def submit_job(job_request: JobRequest):
+    """
+    Queue a product scrape and return its job ID immediately.
+    
+    Poll `GET /jobs/{job_id}` for the result, or pass `callback_url` to have the
+    finished job POSTed to it. Callback hosts have to be public, or listed in
+    JOB_CALLBACK_ALLOWED_HOSTS.
+    """
+    if job_request.callback_url:
+        try:
+            await run_in_threadpool(check_callback_url, job_request.callback_url)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    variants = [variant.value for variant in job_request.variants] if job_request.variants else None
+    job = await run_in_threadpool(
+        job_store.submit, job_request.product_id, variants, job_request.callback_url
+    )
+    logger.info(f"Queued job {job['id']} for product {job_request.product_id}")
+    return {"code": 202, "msg": "accepted", "data": job}
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str = Path(..., description="ID returned when the job was submitted")):
+    """Get the status, and once finished the result, of a scrape job."""
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"code": 200, "msg": job["status"], "data": job}
@@ -1,34 +1,132 @@
-from fastapi import APIRouter, HTTPException, Path
-from typing import Dict, Any
+from fastapi import APIRouter, Header, HTTPException, Path, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Any, List, Optional
+import json
 import logging
+import time
 
-from app.models.schemas import ProductResponse
-from app.services.scraper import scrape_product_data
+from app.core.config import settings
+from app.models.schemas import BatchProductRequest, ProductResponse, ProductVariant
+from app.services.batch import scrape_batch
+from app.services.cache import product_cache
+from app.services.fast_path import fast_path
+from app.services.products import get_product, scrape_flight
+from app.services.resource_governor import resource_governor
+from app.utils.concurrency import (
+    DeadlineExceeded, ScrapeCancelled, ScrapeRejected, cancel_on_disconnect, deadline_scope
+)
+from app.utils.encoding import dumps, json_bytes_response, splice_object
+from app.utils.proxies import proxy_pool
+from app.utils.rate_limiter import rate_limiter
+from app.utils.timing import collect_request_timings
+from app.utils.sessions import session_store
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix='/product')
 
+def resolve_deadline(query_deadline, header_deadline):
+    """Seconds the request may take: query param, then header, then the server default, capped."""
+    requested = query_deadline or header_deadline or settings.REQUEST_DEADLINE_SECONDS
+    return min(requested, settings.REQUEST_DEADLINE_MAX_SECONDS)
+
 @router.post("/search-by-id/{product_id}", response_model=ProductResponse)
 async def get_product_by_id(
-    product_id: int = Path(..., description="The product ID from 1688.com")
+    request: Request,
+    product_id: int = Path(..., description="The product ID from 1688.com"),
+    variants: Optional[List[ProductVariant]] = Query(
+        None, description="Variants to fetch; defaults to both retail and wholesale"
+    ),
+    max_age: Optional[int] = Query(
+        None, ge=0, description="Maximum age in seconds of cached data to accept"
+    ),
+    force_refresh: bool = Query(False, description="Bypass the cache and scrape again"),
+    include_timings: bool = Query(False, description="Add per-stage timings of the scrape to the response"),
+    deadline: Optional[float] = Query(
+        None, gt=0, description="Seconds the request may take; overrides the X-Request-Deadline header"
+    ),
+    x_request_deadline: Optional[float] = Header(None, gt=0)
 ):
     """
     Get product details from 1688.com by product ID.
     
-    This endpoint fetches both retail and wholesale data from the product page.
+    This endpoint fetches the retail and wholesale data from the product page in parallel.
+    Pass `variants` to fetch only one of them. Recently scraped variants are
+    served from the cache unless `force_refresh` is set or they exceed `max_age`.
+    With `include_timings`, the response also carries the stage timings of every
+    variant scraped for this request.
+    
+    Scraping stops when the request deadline passes (504). When the scrape queue
+    is over capacity the request is rejected with 429 and a Retry-After header.
     """
     try:
-        product_data = await scrape_product_data(product_id)
+        url_types = [variant.value for variant in variants] if variants else None
+        started = time.perf_counter()
+        with deadline_scope(resolve_deadline(deadline, x_request_deadline)), \
+                collect_request_timings() as timings:
+            product_data = await cancel_on_disconnect(
+                request, get_product(
+                    product_id, url_types, max_age=max_age, force_refresh=force_refresh, encoded=True
+                )
+            )
         
-        # Success response format
-        return {
-            "code": 200,
-            "msg": "success",
-            "data": product_data
-        }
+        # Success response format, spliced from the JSON bytes kept in the cache
+        body = b'{"code":200,"msg":"success","data":' + splice_object(product_data.items())
+        if include_timings:
+            body += b',"timings":' + dumps({**timings, "total": round(time.perf_counter() - started, 3)})
+        return await run_in_threadpool(json_bytes_response, body + b"}", request)
     except HTTPException as e:
         # Re-raise the HTTP exception
         raise e
+    except ScrapeRejected as e:
+        logger.warning(f"Rejected product {product_id}: {e}")
+        raise HTTPException(
+            status_code=429, detail="Scraper is at capacity", headers={"Retry-After": str(e.retry_after)}
+        )
+    except DeadlineExceeded:
+        logger.warning(f"Scrape for product {product_id} exceeded its deadline")
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
+    except ScrapeCancelled:
+        logger.info(f"Scrape for product {product_id} cancelled by client disconnect")
+        raise HTTPException(status_code=499, detail="Client closed request")
     except Exception as e:
         logger.exception(f"Error fetching product data: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters of the product result cache."""
+    return product_cache.stats()
+
+@router.get("/stats")
+async def get_scraper_stats():
+    """Counters of the caching, coalescing, fast path, rate limiting, proxy and session layers."""
+    return {
+        "cache": product_cache.stats(),
+        "single_flight": scrape_flight.stats(),
+        "fast_path": fast_path.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "proxies": proxy_pool.stats(),
+        "resources": resource_governor.stats(),
+        "sessions": session_store.stats()
+    }
+
+@router.post("/batch")
+async def get_products_batch(batch: BatchProductRequest):
+    """
+    Scrape many products from 1688.com in one call.
+    
+    Results are streamed back as newline-delimited JSON in completion order, one
+    object per product with its `product_id`, `code`, `msg` and, on success, `data`.
+    """
+    url_types = [variant.value for variant in batch.variants] if batch.variants else None
+    # Duplicate IDs are only scraped once
+    product_ids = list(dict.fromkeys(batch.product_ids))
+    
+    async def stream_results():
+        async for item in scrape_batch(
+            product_ids, url_types, max_age=batch.max_age, force_refresh=batch.force_refresh
+        ):
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
\ No newline at end of file
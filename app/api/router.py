@@ -1,8 +1,10 @@
 from fastapi import APIRouter
-from app.api.endpoints import product
+from app.api.endpoints import archive, jobs, product
 from app.core.config import settings
 
 api_router = APIRouter(prefix=settings.API_PREFIX)
 
 # Include all endpoint routers
-api_router.include_router(product.router, tags=["products"])
\ No newline at end of file
+api_router.include_router(product.router, tags=["products"])
+api_router.include_router(jobs.router, tags=["jobs"])
+api_router.include_router(archive.router, tags=["archive"])
\ No newline at end of file
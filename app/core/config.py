@@ -13,7 +13,169 @@ class Settings(BaseSettings):
         "--window-size=1920,1080"
     ]
     
+    # Product pages are fetched from here; benchmarks point it at a local fake server
+    PRODUCT_BASE_URL: str = "https://detail.1688.com/offer"
+    
+    # Driver pool configuration
+    DRIVER_POOL_MIN_SIZE: int = 1
+    DRIVER_POOL_MAX_SIZE: int = 4
+    DRIVER_POOL_MAX_USES: int = 50
+    DRIVER_POOL_MAX_AGE_MINUTES: int = 30
+    DRIVER_POOL_CHECKOUT_TIMEOUT: int = 60
+    DRIVER_POOL_DRAIN_TIMEOUT: int = 30
+    # Launch the warm drivers after startup instead of blocking it; see /ready
+    DRIVER_POOL_BACKGROUND_START: bool = True
+    # Pooled drivers are tabs packed this many to a Chrome process (1 = one browser each);
+    # DRIVER_POOL_MAX_SIZE then counts tabs
+    TABS_PER_BROWSER: int = 1
+    
+    # Patched chromedriver and template profile cached on disk to cut cold starts
+    BROWSER_CACHE_ENABLED: bool = True
+    BROWSER_CACHE_DIR: str = "data/browser"
+    CHROME_VERSION_MAIN: Optional[int] = None
+    
+    # Page loading; "eager" returns from navigation at DOMContentLoaded
+    PAGE_LOAD_STRATEGY: str = "eager"
+    PAGE_READY_TIMEOUT: float = 15.0
+    PAGE_READY_POLL_INTERVAL: float = 0.1
+    CAPTCHA_VERIFY_TIMEOUT: float = 5.0
+    PAGE_LOAD_TIMEOUT: float = 60.0
+    # Read the payload globals from the live page in one script call instead of
+    # transferring and parsing page_source (still fetched for the archive or as fallback)
+    EXTRACT_IN_PAGE: bool = True
+    
+    # Resource blocking; resource types are image, font, media and stylesheet.
+    # The captcha scripts (g.alicdn.com/AWSC, cf.aliyun.com) must stay unblocked.
+    BLOCK_RESOURCES_ENABLED: bool = True
+    BLOCKED_RESOURCE_TYPES: list = ["image", "font", "media"]
+    BLOCKED_URL_PATTERNS: list = [
+        "*mmstat.com*",
+        "*googletagmanager.com*",
+        "*google-analytics.com*",
+        "*/alilog/*",
+        "*/aplus*.js*"
+    ]
+    TRACK_PAGE_BYTES: bool = True
+    
+    # Adaptive request rate (requests/second across the process), backed off on captchas
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_INITIAL_RPS: float = 1.0
+    RATE_LIMIT_MIN_RPS: float = 0.1
+    RATE_LIMIT_MAX_RPS: float = 5.0
+    RATE_LIMIT_INCREASE_STEP: float = 0.05
+    RATE_LIMIT_DECREASE_FACTOR: float = 0.5
+    RATE_LIMIT_WINDOW: int = 50
+    RATE_LIMIT_CAPTCHA_THRESHOLD: float = 0.1
+    RATE_LIMIT_COOLDOWN_SECONDS: float = 10.0
+    RATE_LIMIT_BURST: int = 2
+    
+    # Plain HTTP fetch with cookies harvested from a browser, tried before Chrome
+    HTTP_FAST_PATH_ENABLED: bool = True
+    HTTP_FAST_PATH_REQUIRE_SESSION: bool = True
+    HTTP_FAST_PATH_TIMEOUT: float = 10.0
+    HTTP_FAST_PATH_POOL_SIZE: int = 10
+    HTTP_FAST_PATH_SESSION_MAX_AGE_MINUTES: int = 30
+    
+    # Upstream proxies (scheme://[user:pass@]host:port) for browsers and the fast path;
+    # empty means direct. Chrome cannot send proxy credentials, so browsers need
+    # IP-allowlisted proxies. A proxy is quarantined after consecutive failures or when
+    # its rolling captcha + failure rate passes the threshold, then re-probed with backoff.
+    PROXY_URLS: list = []
+    PROXY_SCORE_ALPHA: float = 0.2
+    PROXY_MAX_CONSECUTIVE_FAILURES: int = 3
+    PROXY_QUARANTINE_BAD_RATE: float = 0.5
+    PROXY_MIN_SAMPLES: int = 5
+    PROXY_QUARANTINE_SECONDS: float = 60.0
+    PROXY_QUARANTINE_MAX_SECONDS: float = 1800.0
+    PROXY_PROBE_URL: str = "https://www.1688.com/"
+    PROXY_PROBE_TIMEOUT: float = 10.0
+    
+    # Captcha-cleared browser sessions reused by new and pooled drivers
+    SESSION_STORE_ENABLED: bool = True
+    SESSION_STORE_DIR: str = "data/sessions"
+    SESSION_STORE_MAX_SESSIONS: int = 20
+    SESSION_MAX_AGE_MINUTES: int = 120
+    SESSION_MAX_CONSECUTIVE_CHALLENGES: int = 2
+    SESSION_MIN_SUCCESS_RATE: float = 0.5
+    SESSION_MIN_USES_FOR_RATE: int = 5
+    # Score updates are written to disk at most this often per session
+    SESSION_PERSIST_INTERVAL_SECONDS: float = 30.0
+    
+    # Scrape execution
+    SCRAPE_MAX_CONCURRENCY: int = 4
+    DISCONNECT_POLL_INTERVAL: float = 1.0
+    
+    # Host resource governor, active when the optional psutil package is installed.
+    # Browsers whose process tree passes the RSS limit are recycled, orphaned Chrome
+    # processes are reaped, and scrape concurrency moves between 1 and
+    # SCRAPE_MAX_CONCURRENCY with free memory and load average per CPU
+    GOVERNOR_ENABLED: bool = True
+    GOVERNOR_INTERVAL: float = 5.0
+    GOVERNOR_BROWSER_MAX_RSS_MB: int = 2048
+    GOVERNOR_MIN_FREE_MEMORY_MB: int = 1024
+    GOVERNOR_MAX_LOAD_PER_CPU: float = 1.5
+    GOVERNOR_ORPHAN_GRACE_SECONDS: float = 120.0
+    
+    # Request deadlines (overridable per request up to the max) and admission control;
+    # a request is rejected with 429 when SCRAPE_MAX_QUEUE jobs already wait for a worker
+    REQUEST_DEADLINE_SECONDS: float = 120.0
+    REQUEST_DEADLINE_MAX_SECONDS: float = 600.0
+    DEADLINE_MIN_ATTEMPT_SECONDS: float = 5.0
+    SCRAPE_MAX_QUEUE: int = 32
+    
+    # Response encoding; brotli is offered when the optional brotli package is installed
+    RESPONSE_COMPRESSION_ENABLED: bool = True
+    RESPONSE_COMPRESSION_MIN_SIZE: int = 1024
+    RESPONSE_GZIP_LEVEL: int = 5
+    RESPONSE_BROTLI_QUALITY: int = 4
+    
+    # Batch scraping
+    BATCH_CONCURRENCY: int = 2
+    BATCH_MAX_PRODUCTS: int = 5000
+    
+    # Result cache; set CACHE_DB_PATH to an empty string to keep it in memory only
+    CACHE_ENABLED: bool = True
+    CACHE_MEMORY_MAX_ENTRIES: int = 1024
+    CACHE_TTL_SECONDS: int = 3600
+    CACHE_STALE_TTL_SECONDS: int = 6 * 3600
+    CACHE_DB_PATH: str = "cache/products.sqlite3"
+    CACHE_PURGE_INTERVAL_SECONDS: int = 3600
+    
+    # Durable job queue; each worker process runs its own browser pool, so the API
+    # starts none by default and jobs wait for `python -m app.workers.job_worker`
+    JOB_DB_PATH: str = "data/jobs.sqlite3"
+    JOB_WORKER_PROCESSES: int = 0
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_LEASE_SECONDS: int = 300
+    JOB_RETRY_BACKOFF_SECONDS: int = 30
+    JOB_POLL_INTERVAL: float = 1.0
+    JOB_SUPERVISOR_INTERVAL: float = 10.0
+    JOB_CALLBACK_TIMEOUT: float = 10.0
+    JOB_CALLBACK_ATTEMPTS: int = 3
+    # Hosts callbacks may go to; when empty, any public address is allowed
+    JOB_CALLBACK_ALLOWED_HOSTS: list = []
+    JOB_CALLBACK_ALLOW_PRIVATE: bool = False
+    
+    # Content-addressed archive of fetched pages for re-extraction without re-scraping
+    ARCHIVE_ENABLED: bool = False
+    ARCHIVE_DIR: str = "data/archive"
+    ARCHIVE_COMPRESSION_LEVEL: int = 6
+    
+    # Change monitor; re-crawl intervals shrink for products that change and grow for static ones
+    MONITOR_ENABLED: bool = False
+    MONITOR_DB_PATH: str = "data/monitor.sqlite3"
+    MONITOR_DELTA_PATH: str = "data/deltas.jsonl"
+    MONITOR_WEBHOOK_URL: Optional[str] = None
+    MONITOR_CONCURRENCY: int = 2
+    MONITOR_INITIAL_INTERVAL_SECONDS: int = 3600
+    MONITOR_MIN_INTERVAL_SECONDS: int = 600
+    MONITOR_MAX_INTERVAL_SECONDS: int = 24 * 3600
+    MONITOR_CHANGE_FACTOR: float = 0.5
+    MONITOR_UNCHANGED_FACTOR: float = 1.5
+    MONITOR_ERROR_RETRY_SECONDS: int = 300
+    MONITOR_POLL_INTERVAL: float = 5.0
+    
     class Config:
         env_file = ".env"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -1,5 +1,18 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 from app.api.router import api_router
+from app.utils.browser_cache import browser_cache
+from app.utils.driver_pool import driver_pool
+from app.utils.concurrency import scrape_executor
+from app.services.cache import product_cache
+from app.services.monitor import change_monitor
+from app.services.resource_governor import resource_governor
+from app.services.runtime_metrics import render_metrics
+from app.core.config import settings
+from app.workers.job_worker import worker_supervisor
 import logging
 
 # Configure logging
@@ -9,9 +22,57 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+async def supervise_workers():
+    """Respawn job worker processes that die."""
+    while True:
+        await asyncio.sleep(settings.JOB_SUPERVISOR_INTERVAL)
+        try:
+            worker_supervisor.check()
+        except Exception as e:
+            logger.error(f"Worker supervision failed: {e}")
+
+async def purge_cache():
+    """Keep the on-disk result cache from growing without bound."""
+    while True:
+        try:
+            await product_cache.purge()
+        except Exception as e:
+            logger.error(f"Cache purge failed: {e}")
+        await asyncio.sleep(settings.CACHE_PURGE_INTERVAL_SECONDS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the driver pool and start job workers on startup; drain both on shutdown."""
+    warmup_task = None
+    if settings.DRIVER_POOL_BACKGROUND_START:
+        # Serve right away; /ready reports when warm drivers are available
+        warmup_task = asyncio.create_task(run_in_threadpool(driver_pool.start))
+    else:
+        await run_in_threadpool(driver_pool.start)
+    worker_supervisor.start()
+    supervisor_task = asyncio.create_task(supervise_workers())
+    purge_task = asyncio.create_task(purge_cache()) if settings.CACHE_ENABLED else None
+    monitor_task = asyncio.create_task(change_monitor.run()) if settings.MONITOR_ENABLED else None
+    governor_task = asyncio.create_task(resource_governor.run()) if settings.GOVERNOR_ENABLED else None
+    yield
+    supervisor_task.cancel()
+    if purge_task is not None:
+        purge_task.cancel()
+    if monitor_task is not None:
+        monitor_task.cancel()
+    if governor_task is not None:
+        governor_task.cancel()
+    await run_in_threadpool(worker_supervisor.stop)
+    await run_in_threadpool(driver_pool.drain)
+    if warmup_task is not None:
+        await asyncio.gather(warmup_task, return_exceptions=True)
+    scrape_executor.shutdown()
+    product_cache.close()
+
 app = FastAPI(
     title="1688 Product Scraper API",
-    description="API for scraping product data from 1688.com"
+    description="API for scraping product data from 1688.com",
+    lifespan=lifespan
 )
 
 # Include all API routes
@@ -22,6 +83,31 @@ async def health_check():
     """Simple health check endpoint"""
     return {"status": "ok"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe; 503 until the pool has warm browser capacity"""
+    pool = driver_pool.stats()
+    executor = scrape_executor.stats()
+    ready = pool["started"] and (pool["idle"] + pool["in_use"] > 0 or pool["min_size"] == 0)
+    body = {
+        "status": "ready" if ready else "warming",
+        "warm_drivers": pool["idle"],
+        "in_use": pool["in_use"],
+        "starting": pool["starting"],
+        "min_size": pool["min_size"],
+        "max_size": pool["max_size"],
+        "free_scrape_slots": max(executor["limit"] - executor["running"], 0),
+        "browser_cache": browser_cache.stats(),
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics of the scrape pipeline"""
+    # Some gauges query SQLite or take pool locks; keep them off the event loop
+    body = await run_in_threadpool(render_metrics)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,11 +1,35 @@
-from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from enum import Enum
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional
+
+from app.core.config import settings
+
+class ProductVariant(str, Enum):
+    retail = "retail"
+    wholesale = "wholesale"
 
 class ErrorResponse(BaseModel):
     code: int
     message: str
 
 class ProductResponse(BaseModel):
+    code: int
+    msg: str
+    data: Dict[str, Any]
+    timings: Optional[Dict[str, Any]] = None
+
+class BatchProductRequest(BaseModel):
+    product_ids: List[int] = Field(..., min_length=1, max_length=settings.BATCH_MAX_PRODUCTS)
+    variants: Optional[List[ProductVariant]] = None
+    max_age: Optional[int] = Field(None, ge=0)
+    force_refresh: bool = False
+
+class JobRequest(BaseModel):
+    product_id: int
+    variants: Optional[List[ProductVariant]] = None
+    callback_url: Optional[str] = None
+
+class JobResponse(BaseModel):
     code: int
     msg: str
     data: Dict[str, Any]
\ No newline at end of file
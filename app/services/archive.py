@@ -0,0 +1,247 @@
+"""Content-addressed archive of fetched product pages.
+
+Each distinct page is stored once as a gzip blob named after the SHA-256 of its
+HTML, and every fetch is indexed by product ID, variant and time in SQLite, so
+pages can be re-extracted in bulk after the extractor changes:
+
+    python -m app.services.archive reextract --workers 8 --output pages.jsonl
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from app.core.config import settings
+from app.utils.extractor import extract_json_data
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES blobs (sha256),
+    source TEXT,
+    extracted INTEGER NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_product ON pages (product_id, variant, fetched_at);
+CREATE INDEX IF NOT EXISTS pages_fetched ON pages (fetched_at);
+"""
+
+class PageArchive:
+    """Writes each distinct page once, compressed, and indexes every fetch of it."""
+
+    def __init__(self, directory, compression_level=6):
+        self.directory = directory
+        self.compression_level = compression_level
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.counters = {"stored": 0, "deduplicated": 0, "errors": 0}
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(self.directory, exist_ok=True)
+            conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def blob_path(self, sha256):
+        return os.path.join(self.directory, "blobs", sha256[:2], f"{sha256}.html.gz")
+
+    def _write_blob(self, sha256, content):
+        path = self.blob_path(sha256)
+        if os.path.exists(path):
+            return None
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = gzip.compress(content, compresslevel=self.compression_level, mtime=0)
+        # Unique temp name so concurrent writers of the same page do not collide
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+        return len(compressed)
+
+    def store(self, product_id, variant, html_content, source=None, extracted=True) -> str:
+        """Archive one fetched page; returns its content hash."""
+        content = html_content.encode("utf-8")
+        sha256 = hashlib.sha256(content).hexdigest()
+        now = time.time()
+        conn = self._connect()
+        known = conn.execute("SELECT 1 FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+        stored_size = None if known else self._write_blob(sha256, content)
+        with conn:
+            if stored_size is not None:
+                conn.execute(
+                    "INSERT OR IGNORE INTO blobs (sha256, size, stored_size, created_at) VALUES (?, ?, ?, ?)",
+                    (sha256, len(content), stored_size, now)
+                )
+            elif not known:
+                # Blob file written by another process before its index row landed
+                conn.execute(
+                    "INSERT OR IGNORE INTO blobs (sha256, size, stored_size, created_at) VALUES (?, ?, ?, ?)",
+                    (sha256, len(content), os.path.getsize(self.blob_path(sha256)), now)
+                )
+            conn.execute(
+                "INSERT INTO pages (product_id, variant, sha256, source, extracted, fetched_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (str(product_id), variant, sha256, source, int(bool(extracted)), now)
+            )
+        with self._lock:
+            self.counters["stored" if stored_size is not None else "deduplicated"] += 1
+        return sha256
+
+    def load(self, sha256) -> str:
+        with gzip.open(self.blob_path(sha256), "rb") as f:
+            return f.read().decode("utf-8")
+
+    def pages(self, product_id=None, variant=None, since=None, until=None,
+              latest_only=False, limit=None) -> Iterator[Dict[str, Any]]:
+        """Iterate index rows, oldest first, optionally keeping only the latest per variant."""
+        clauses, params = [], []
+        for column, op, value in (("product_id", "=", product_id), ("variant", "=", variant),
+                                  ("fetched_at", ">=", since), ("fetched_at", "<", until)):
+            if value is not None:
+                clauses.append(f"p.{column} {op} ?")
+                params.append(str(value) if column == "product_id" else value)
+        if latest_only:
+            clauses.append(
+                "p.id = (SELECT id FROM pages WHERE product_id = p.product_id AND variant = p.variant"
+                " ORDER BY fetched_at DESC, id DESC LIMIT 1)"
+            )
+        query = "SELECT p.* FROM pages p"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY p.fetched_at, p.id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        for row in self._connect().execute(query, params):
+            yield dict(row)
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        blobs = conn.execute(
+            "SELECT COUNT(*) AS n, COALESCE(SUM(size), 0) AS size, COALESCE(SUM(stored_size), 0) AS stored"
+            " FROM blobs"
+        ).fetchone()
+        pages = conn.execute("SELECT COUNT(*) AS n FROM pages").fetchone()
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "pages": pages["n"],
+            "blobs": blobs["n"],
+            "bytes": blobs["size"],
+            "stored_bytes": blobs["stored"],
+        }
+
+page_archive = PageArchive(settings.ARCHIVE_DIR, settings.ARCHIVE_COMPRESSION_LEVEL)
+
+def archive_page(product_id, variant, html_content, source, extracted=True):
+    """Archive a fetched page if the archive is enabled; never fails the scrape."""
+    if not settings.ARCHIVE_ENABLED or product_id is None or not html_content:
+        return None
+    try:
+        return page_archive.store(product_id, variant, html_content, source, extracted)
+    except (OSError, sqlite3.Error) as e:
+        page_archive.counters["errors"] += 1
+        logger.warning(f"Could not archive {variant} page of {product_id}: {e}")
+        return None
+
+def _extract_blob(path):
+    try:
+        with gzip.open(path, "rb") as f:
+            return extract_json_data(f.read().decode("utf-8")), None
+    except Exception as e:
+        return None, str(e)
+
+def reextract(rows: Iterable[Dict[str, Any]], archive: PageArchive = page_archive,
+              workers: Optional[int] = None, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+    """Run the current extractor over archived pages, each distinct blob once per batch.
+
+    Yields the index rows with `data` (None when nothing was extracted) and `error`,
+    in order and as soon as each row's blob is extracted.
+    """
+    rows = iter(rows)
+    with (nullcontext() if workers == 1 else multiprocessing.Pool(workers)) as pool:
+        while True:
+            # Only one batch of rows and payloads is held in memory at a time
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            unique = list(dict.fromkeys(row["sha256"] for row in batch))
+            paths = [archive.blob_path(sha256) for sha256 in unique]
+            extracted = zip(unique, map(_extract_blob, paths) if pool is None
+                            else pool.imap(_extract_blob, paths, chunksize=16))
+            results = {}
+            for row in batch:
+                # Blobs come back in order of first use, so each row waits only for its own
+                while row["sha256"] not in results:
+                    sha256, result = next(extracted)
+                    results[sha256] = result
+                data, error = results[row["sha256"]]
+                yield {**row, "data": data, "error": error}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect the page archive and re-extract archived pages")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Print archive counters")
+    run = commands.add_parser("reextract", help="Re-run extraction over archived pages")
+    run.add_argument("--product-id")
+    run.add_argument("--variant")
+    run.add_argument("--since", type=float, help="Only pages fetched at or after this Unix time")
+    run.add_argument("--until", type=float, help="Only pages fetched before this Unix time")
+    run.add_argument("--all", action="store_true", help="Every fetch instead of the latest per variant")
+    run.add_argument("--limit", type=int)
+    run.add_argument("--workers", type=int, default=None, help="Extraction processes (default: CPU count)")
+    run.add_argument("--output", help="JSONL file to write results to (default: stdout)")
+    args = parser.parse_args(argv)
+
+    # The extractor logs every page at INFO
+    logging.basicConfig(level=logging.WARNING)
+    if args.command == "stats":
+        print(json.dumps(page_archive.stats(), indent=2))
+        return
+
+    rows = page_archive.pages(
+        product_id=args.product_id, variant=args.variant, since=args.since, until=args.until,
+        latest_only=not args.all, limit=args.limit
+    )
+    started = time.perf_counter()
+    total = extracted = 0
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for result in reextract(rows, workers=args.workers):
+            total += 1
+            extracted += result["data"] is not None
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - started
+    print(f"Re-extracted {total} page(s), {extracted} with data, in {elapsed:.1f}s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
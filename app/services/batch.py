@@ -0,0 +1,70 @@
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.products import get_product
+from app.utils.concurrency import DeadlineExceeded, ScrapeCancelled, ScrapeRejected
+
+logger = logging.getLogger(__name__)
+
+async def _scrape_item(product_id: int, variants: Optional[List[str]], **cache_options) -> Dict[str, Any]:
+    """Scrape one product of a batch, turning failures into an error entry."""
+    try:
+        data = await get_product(product_id, variants, **cache_options)
+        return {"product_id": product_id, "code": 200, "msg": "success", "data": data}
+    except HTTPException as e:
+        return {"product_id": product_id, "code": e.status_code, "msg": str(e.detail)}
+    # Same statuses as the single-product endpoint
+    except ScrapeRejected as e:
+        logger.warning(f"Rejected product {product_id} in batch: {e}")
+        return {"product_id": product_id, "code": 429, "msg": "Scraper is at capacity"}
+    except DeadlineExceeded:
+        logger.warning(f"Scrape for product {product_id} in batch exceeded its deadline")
+        return {"product_id": product_id, "code": 504, "msg": "Request deadline exceeded"}
+    except ScrapeCancelled:
+        logger.info(f"Scrape for product {product_id} in batch cancelled by client disconnect")
+        return {"product_id": product_id, "code": 499, "msg": "Client closed request"}
+    except Exception as e:
+        logger.exception(f"Error scraping product {product_id} in batch: {e}")
+        return {"product_id": product_id, "code": 500, "msg": str(e)}
+
+async def scrape_batch(
+    product_ids: Iterable[int],
+    variants: Optional[List[str]] = None,
+    concurrency: Optional[int] = None,
+    max_age: Optional[int] = None,
+    force_refresh: bool = False
+) -> AsyncIterator[Dict[str, Any]]:
+    """Scrape many products, yielding each result as soon as it completes.
+
+    At most `concurrency` products are in flight at once so a large batch
+    queues on the scrape executor instead of flooding it.
+    """
+    concurrency = concurrency or settings.BATCH_CONCURRENCY
+    queue = asyncio.Queue()
+    for product_id in product_ids:
+        queue.put_nowait(product_id)
+    results = asyncio.Queue()
+
+    async def worker():
+        while True:
+            try:
+                product_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            item = await _scrape_item(product_id, variants, max_age=max_age, force_refresh=force_refresh)
+            await results.put(item)
+
+    total = queue.qsize()
+    workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, total))]
+    try:
+        for _ in range(total):
+            yield await results.get()
+    finally:
+        # Stop outstanding scrapes when the consumer goes away early
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,237 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from app.core.config import settings
+from app.utils.encoding import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Bump when the shape of cached payloads changes so old entries are ignored
+CACHE_KEY_VERSION = 2
+
+_UNSET = object()
+
+class CacheEntry:
+    """A cached value and the wall-clock time it was scraped at.
+
+    The value and its JSON encoding are each computed on first use, so entries
+    read from disk can be served as bytes without ever being parsed.
+    """
+
+    __slots__ = ("_value", "_encoded", "stored_at")
+
+    def __init__(self, value=_UNSET, stored_at=None, encoded=None):
+        self._value = value
+        self._encoded = encoded
+        self.stored_at = time.time() if stored_at is None else stored_at
+
+    @property
+    def value(self):
+        if self._value is _UNSET:
+            self._value = loads(self._encoded)
+        return self._value
+
+    @property
+    def encoded(self) -> bytes:
+        if self._encoded is None:
+            self._encoded = dumps(self._value)
+        return self._encoded
+
+    @property
+    def age(self):
+        return max(time.time() - self.stored_at, 0.0)
+
+class MemoryLRU:
+    """Bounded in-memory LRU of cache entries."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry: CacheEntry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+class SQLiteStore:
+    """Persistent cache entries in a local SQLite database."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+        return self._conn
+
+    def get(self, key) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT value, stored_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        encoded = row[0].encode("utf-8") if isinstance(row[0], str) else row[0]
+        return CacheEntry(stored_at=row[1], encoded=encoded)
+
+    def set(self, key, entry: CacheEntry):
+        value = entry.encoded.decode("utf-8")
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, value, entry.stored_at)
+            )
+            conn.commit()
+
+    def purge(self, older_than):
+        """Delete entries stored more than `older_than` seconds ago."""
+        with self._lock:
+            conn = self._connect()
+            cursor = conn.execute("DELETE FROM cache WHERE stored_at < ?", (time.time() - older_than,))
+            conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class ResultCache:
+    """Two-tier cache of scraped product variants: memory LRU over SQLite.
+
+    Entries younger than `ttl` are fresh. Entries older than that but within
+    `stale_ttl` more seconds may be served while a refresh runs in the background.
+    """
+
+    def __init__(self, memory: MemoryLRU, store: Optional[SQLiteStore], ttl, stale_ttl):
+        self.memory = memory
+        self.store = store
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+        }
+
+    @staticmethod
+    def make_key(product_id, variant):
+        return f"v{CACHE_KEY_VERSION}:{product_id}:{variant}"
+
+    def stats(self):
+        """Return hit/miss counters and the current memory size."""
+        lookups = sum(self.counters[name] for name in ("memory_hits", "disk_hits", "stale_hits", "misses"))
+        hits = lookups - self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+        }
+
+    async def get(self, product_id, variant, max_age=None) -> Optional[CacheEntry]:
+        """Look an entry up in memory, then on disk, and return it if it may be served.
+
+        Fresh entries count as memory or disk hits. Stale ones are only returned,
+        as stale hits, when no `max_age` is given; the caller then revalidates them.
+        Anything else counts as a miss.
+        """
+        key = self.make_key(product_id, variant)
+        tier = "memory_hits"
+        entry = self.memory.get(key)
+        if entry is None or self._is_expired(entry):
+            entry = None
+            if self.store is not None:
+                try:
+                    entry = await asyncio.to_thread(self.store.get, key)
+                except Exception as e:
+                    logger.error(f"Cache store lookup failed for {key}: {e}")
+                if entry is not None and not self._is_expired(entry):
+                    tier = "disk_hits"
+                    self.memory.set(key, entry)
+                else:
+                    entry = None
+
+        if entry is not None and self.is_fresh(entry, max_age):
+            self.counters[tier] += 1
+            return entry
+        if entry is not None and max_age is None:
+            self.counters["stale_hits"] += 1
+            return entry
+        self.counters["misses"] += 1
+        return None
+
+    async def set(self, product_id, variant, value: Any) -> CacheEntry:
+        key = self.make_key(product_id, variant)
+        entry = CacheEntry(value)
+        self.memory.set(key, entry)
+        if self.store is not None:
+            try:
+                await asyncio.to_thread(self.store.set, key, entry)
+            except Exception as e:
+                logger.error(f"Cache store write failed for {key}: {e}")
+        return entry
+
+    def is_fresh(self, entry: CacheEntry, max_age=None):
+        limit = self.ttl if max_age is None else min(self.ttl, max_age)
+        return entry.age <= limit
+
+    def _is_expired(self, entry: CacheEntry):
+        return entry.age > self.ttl + self.stale_ttl
+
+    async def purge(self):
+        """Delete entries too old to be served even as stale from the disk store."""
+        if self.store is None:
+            return 0
+        deleted = await asyncio.to_thread(self.store.purge, self.ttl + self.stale_ttl)
+        if deleted:
+            logger.info(f"Purged {deleted} expired cache entries from disk")
+        return deleted
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+product_cache = ResultCache(
+    memory=MemoryLRU(settings.CACHE_MEMORY_MAX_ENTRIES),
+    store=SQLiteStore(settings.CACHE_DB_PATH) if settings.CACHE_DB_PATH else None,
+    ttl=settings.CACHE_TTL_SECONDS,
+    stale_ttl=settings.CACHE_STALE_TTL_SECONDS,
+)
@@ -0,0 +1,157 @@
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.core.config import settings
+from app.services.archive import archive_page
+from app.utils.extractor import extract_json_data, extract_title
+from app.utils.concurrency import clamp_timeout
+from app.utils.metrics import CAPTCHA_OUTCOMES
+from app.utils.proxies import limiter_for, proxy_pool, record_outcome
+from app.utils.rate_limiter import OUTCOME_CAPTCHA, OUTCOME_FAILED, OUTCOME_OK
+from app.utils.timing import count
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+}
+
+class FastPathClient:
+    """Keep-alive HTTP client that fetches product pages without a browser.
+
+    It replays the cookies and user agent of a browser session that got past the
+    captcha; callers fall back to Chrome whenever it returns None. Requests go
+    through the proxy of the browser the session came from, or a proxy from the
+    pool when there is no such session or its proxy is quarantined.
+    """
+
+    def __init__(self, pool_size, timeout, max_session_age, require_session=True):
+        self.timeout = timeout
+        self.max_session_age = max_session_age
+        self.require_session = require_session
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._session.headers.update(DEFAULT_HEADERS)
+        self._harvested_at = None
+        self._proxy = None
+        self._lock = threading.Lock()
+        self.counters = {
+            "attempts": 0,
+            "hits": 0,
+            "captcha": 0,
+            "missing_payload": 0,
+            "errors": 0,
+            "skipped": 0,
+            "harvests": 0,
+        }
+
+    @property
+    def has_session(self):
+        return self._harvested_at is not None and time.time() - self._harvested_at < self.max_session_age
+
+    def stats(self):
+        attempts = self.counters["attempts"]
+        return {
+            **self.counters,
+            "hit_ratio": round(self.counters["hits"] / attempts, 4) if attempts else 0.0,
+            "session_age": round(time.time() - self._harvested_at, 1) if self._harvested_at else None,
+        }
+
+    def needs_harvest(self):
+        """Whether the next browser that passes a page should donate its session."""
+        if self._harvested_at is None:
+            return True
+        # Refresh halfway through the session lifetime so it never lapses under load
+        return time.time() - self._harvested_at > self.max_session_age / 2
+
+    def harvest(self, driver):
+        """Copy cookies and user agent from a browser that just loaded a product page."""
+        try:
+            cookies = driver.get_cookies()
+            user_agent = driver.execute_script("return navigator.userAgent")
+        except Exception as e:
+            logger.warning(f"Could not harvest browser session: {e}")
+            return
+        with self._lock:
+            self._session.cookies.clear()
+            for cookie in cookies:
+                self._session.cookies.set(
+                    cookie["name"], cookie["value"],
+                    domain=cookie.get("domain", ""), path=cookie.get("path", "/")
+                )
+            if user_agent:
+                self._session.headers["User-Agent"] = user_agent
+            # The cookies were issued to the browser's exit IP; keep using it
+            self._proxy = getattr(driver, "proxy", None)
+            self._harvested_at = time.time()
+            self.counters["harvests"] += 1
+        logger.info(f"Harvested browser session with {len(cookies)} cookie(s) for the HTTP fast path")
+
+    def invalidate(self):
+        """Drop the harvested session, e.g. once it starts getting challenged."""
+        with self._lock:
+            self._session.cookies.clear()
+            self._harvested_at = None
+            self._proxy = None
+
+    def fetch(self, url, url_type, product_id=None):
+        """Fetch and extract a product page over plain HTTP; None means use the browser."""
+        if self.require_session and not self.has_session:
+            self.counters["skipped"] += 1
+            return None
+
+        self.counters["attempts"] += 1
+        proxy = self._proxy
+        if proxy is None or proxy.quarantined:
+            proxy = proxy_pool.select()
+        limiter_for(proxy).acquire()
+        try:
+            response = self._session.get(
+                url, timeout=clamp_timeout(self.timeout),
+                proxies=proxy.requests_proxies if proxy is not None else None
+            )
+        except requests.RequestException as e:
+            self.counters["errors"] += 1
+            proxy_pool.record(proxy, OUTCOME_FAILED)
+            logger.info(f"HTTP fast path failed for {url_type}: {e}")
+            return None
+
+        count("fast_path_bytes", len(response.content))
+        html_content = response.text
+        title = extract_title(html_content) or ""
+        if "Captcha Interception" in title:
+            self.counters["captcha"] += 1
+            CAPTCHA_OUTCOMES.inc(outcome="fast_path_challenged")
+            record_outcome(proxy, OUTCOME_CAPTCHA)
+            logger.info(f"HTTP fast path hit a captcha for {url_type}, falling back to browser")
+            self.invalidate()
+            return None
+
+        data = extract_json_data(html_content) if response.ok else None
+        if response.ok:
+            archive_page(product_id, url_type, html_content, "fast_path", extracted=bool(data))
+        if not data:
+            if response.status_code >= 500 or response.status_code == 407:
+                # Gateway and proxy authentication errors are the proxy's fault
+                proxy_pool.record(proxy, OUTCOME_FAILED)
+            self.counters["missing_payload"] += 1
+            logger.info(f"HTTP fast path got no payload for {url_type} (status {response.status_code})")
+            return None
+
+        self.counters["hits"] += 1
+        record_outcome(proxy, OUTCOME_OK, response.elapsed.total_seconds())
+        return data
+
+fast_path = FastPathClient(
+    pool_size=settings.HTTP_FAST_PATH_POOL_SIZE,
+    timeout=settings.HTTP_FAST_PATH_TIMEOUT,
+    max_session_age=settings.HTTP_FAST_PATH_SESSION_MAX_AGE_MINUTES * 60,
+    require_session=settings.HTTP_FAST_PATH_REQUIRE_SESSION,
+)
@@ -0,0 +1,222 @@
+import ipaddress
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+def check_callback_url(url):
+    """Raise ValueError unless `url` is an http(s) URL callbacks may be sent to.
+
+    Without an allowlist, the host has to resolve to public addresses only, so a
+    submitted job cannot make the worker POST into the scraper's own network.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("callback_url must be an absolute http or https URL")
+    host = parts.hostname.lower()
+    allowed = [name.lower() for name in settings.JOB_CALLBACK_ALLOWED_HOSTS]
+    if allowed:
+        if host not in allowed:
+            raise ValueError(f"callback_url host {host} is not allowed")
+        return
+    if settings.JOB_CALLBACK_ALLOW_PRIVATE:
+        return
+    try:
+        infos = socket.getaddrinfo(host, parts.port or (443 if parts.scheme == "https" else 80),
+                                   proto=socket.IPPROTO_TCP)
+    except socket.gaierror:
+        raise ValueError(f"callback_url host {host} does not resolve")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        if not address.is_global:
+            raise ValueError(f"callback_url host {host} resolves to non-public address {address}")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    product_id INTEGER NOT NULL,
+    variants TEXT,
+    callback_url TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    result TEXT,
+    error TEXT,
+    worker_id TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    lease_expires_at REAL,
+    callback_status TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claimable ON jobs (status, available_at);
+"""
+
+class JobStore:
+    """Durable job queue in a local SQLite database, shared by the API and workers.
+
+    Workers lease the jobs they claim. A job whose lease runs out (its worker
+    crashed or hung) is claimed again, after a backoff, until it runs out of attempts.
+    """
+
+    def __init__(self, path, max_attempts, lease_seconds, retry_backoff):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.retry_backoff = retry_backoff
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Autocommit mode; write transactions are opened explicitly
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _backoff(self, attempts):
+        return self.retry_backoff * (2 ** max(attempts - 1, 0))
+
+    def submit(self, product_id: int, variants: Optional[List[str]] = None,
+               callback_url: Optional[str] = None) -> Dict[str, Any]:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        self._connect().execute(
+            "INSERT INTO jobs (id, product_id, variants, callback_url, status, max_attempts,"
+            " created_at, updated_at, available_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, product_id, json.dumps(variants) if variants else None, callback_url,
+             QUEUED, self.max_attempts, now, now, now)
+        )
+        return self.get(job_id)
+
+    def get(self, job_id) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def claim(self, worker_id) -> Optional[Dict[str, Any]]:
+        """Lease the next runnable job to worker_id, or return None if there is none."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._expire_leases(conn, now)
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? AND available_at <= ?"
+                " ORDER BY available_at LIMIT 1",
+                (QUEUED, now)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, worker_id = ?,"
+                " lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                (RUNNING, worker_id, now + self.lease_seconds, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row["id"])
+
+    def _expire_leases(self, conn, now):
+        """Requeue, with backoff, the running jobs whose worker stopped renewing its lease."""
+        expired = conn.execute(
+            "SELECT id, attempts, max_attempts, worker_id FROM jobs"
+            " WHERE status = ? AND lease_expires_at < ?",
+            (RUNNING, now)
+        ).fetchall()
+        for row in expired:
+            logger.warning(f"Lease of job {row['id']} held by {row['worker_id']} expired")
+            if row["attempts"] >= row["max_attempts"]:
+                status, available_at = FAILED, now
+            else:
+                status, available_at = QUEUED, now + self._backoff(row["attempts"])
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, worker_id = NULL, lease_expires_at = NULL,"
+                " available_at = ?, updated_at = ? WHERE id = ?",
+                (status, "Worker stopped before finishing the job", available_at, now, row["id"])
+            )
+
+    def heartbeat(self, job_id, worker_id) -> bool:
+        """Extend the lease of a running job; False if the worker no longer owns it."""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_expires_at = ?, updated_at = ?"
+            " WHERE id = ? AND worker_id = ? AND status = ?",
+            (now + self.lease_seconds, now, job_id, worker_id, RUNNING)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, result: Dict[str, Any]):
+        now = time.time()
+        self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_expires_at = NULL,"
+            " updated_at = ? WHERE id = ? AND worker_id = ?",
+            (SUCCEEDED, json.dumps(result, ensure_ascii=False), now, job_id, worker_id)
+        )
+
+    def fail(self, job_id, worker_id, error: str, retryable: bool = True):
+        """Record a failed attempt, requeueing the job with backoff if attempts remain."""
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return
+        if retryable and row["attempts"] < row["max_attempts"]:
+            status, available_at = QUEUED, now + self._backoff(row["attempts"])
+        else:
+            status, available_at = FAILED, now
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, worker_id = NULL, lease_expires_at = NULL,"
+            " available_at = ?, updated_at = ? WHERE id = ? AND worker_id = ?",
+            (status, error, available_at, now, job_id, worker_id)
+        )
+
+    def set_callback_status(self, job_id, callback_status: str):
+        self._connect().execute(
+            "UPDATE jobs SET callback_status = ? WHERE id = ?", (callback_status, job_id)
+        )
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+        counts.update({row["status"]: row["n"] for row in rows})
+        return counts
+
+    @staticmethod
+    def _to_dict(row) -> Dict[str, Any]:
+        job = dict(row)
+        job["variants"] = json.loads(job["variants"]) if job["variants"] else None
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+job_store = JobStore(
+    path=settings.JOB_DB_PATH,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+    retry_backoff=settings.JOB_RETRY_BACKOFF_SECONDS,
+)
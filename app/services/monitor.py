@@ -0,0 +1,333 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import requests
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.products import get_product
+
+logger = logging.getLogger(__name__)
+
+# Leaf keys holding stock levels; any path through a "price" or "sku" key is watched too
+STOCK_KEYS = {"canbookcount", "amountonsale", "stock", "quantity", "saleablequantity"}
+# Keys whose values change on every page load and say nothing about the offer
+VOLATILE_KEY_PARTS = ("token", "timestamp", "trace", "csrf", "nonce", "servertime")
+
+def _category(keys):
+    """Classify a flattened path as a price, stock or SKU field, or None if unwatched."""
+    lowered = [str(key).lower() for key in keys]
+    if any("price" in key for key in lowered):
+        return "price"
+    if lowered[-1] in STOCK_KEYS or "stock" in lowered[-1]:
+        return "stock"
+    if any("sku" in key for key in lowered):
+        return "sku"
+    return None
+
+def _flatten(value, keys=()):
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield from _flatten(child, keys + (str(key),))
+    elif isinstance(value, list):
+        for index, child in enumerate(value):
+            # Key SKU lists by SKU ID so a reordered list is not reported as a change
+            if isinstance(child, dict) and "skuId" in child:
+                key = f"[skuId={child['skuId']}]"
+            else:
+                key = f"[{index}]"
+            yield from _flatten(child, keys + (key,))
+    else:
+        yield keys, value
+
+def normalize_payload(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Project a scraped product onto its price, stock and SKU fields, keyed by path.
+
+    Falls back to every non-volatile field when none of the watched ones are found,
+    so an unfamiliar payload shape still has its changes detected.
+    """
+    watched, fallback = {}, {}
+    for keys, value in _flatten(data):
+        path = ".".join(keys)
+        if _category(keys) is not None:
+            watched[path] = value
+        elif not any(part in keys[-1].lower() for part in VOLATILE_KEY_PARTS):
+            fallback[path] = value
+    return watched or fallback
+
+def payload_hash(snapshot: Dict[str, Any]) -> str:
+    encoded = json.dumps(snapshot, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+def diff_snapshots(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+    """Changed, added and removed fields between two snapshots, grouped by category."""
+    changes = {}
+    for path in sorted(set(old) | set(new)):
+        before, after = old.get(path), new.get(path)
+        if path in old and path in new and before == after:
+            continue
+        kind = "changed" if path in old and path in new else ("added" if path in new else "removed")
+        category = _category(path.split(".")) or "other"
+        changes.setdefault(category, []).append({"path": path, "change": kind, "old": before, "new": after})
+    return changes
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watchlist (
+    product_id TEXT PRIMARY KEY,
+    variants TEXT,
+    interval REAL NOT NULL,
+    next_run_at REAL NOT NULL,
+    last_hash TEXT,
+    snapshot TEXT,
+    checks INTEGER NOT NULL DEFAULT 0,
+    changes INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    last_checked_at REAL,
+    last_changed_at REAL,
+    last_error TEXT,
+    added_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS watchlist_due ON watchlist (next_run_at);
+"""
+
+# Columns returned for scheduling; the snapshot is only loaded once a change is seen
+_ENTRY_COLUMNS = (
+    "product_id, variants, interval, next_run_at, last_hash, checks, changes, errors,"
+    " last_checked_at, last_changed_at, last_error, added_at"
+)
+
+class WatchStore:
+    """Watched products with their last snapshot and re-crawl schedule, in SQLite."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def add(self, product_id, variants: Optional[List[str]] = None, interval: Optional[float] = None):
+        """Watch a product, or update its variants; it is checked on the next round."""
+        now = time.time()
+        interval = interval or settings.MONITOR_INITIAL_INTERVAL_SECONDS
+        self._connect().execute(
+            "INSERT INTO watchlist (product_id, variants, interval, next_run_at, added_at)"
+            " VALUES (?, ?, ?, ?, ?) ON CONFLICT (product_id) DO UPDATE SET"
+            " variants = excluded.variants, next_run_at = excluded.next_run_at",
+            (str(product_id), json.dumps(variants) if variants else None, interval, now, now)
+        )
+
+    def remove(self, product_id) -> bool:
+        cursor = self._connect().execute("DELETE FROM watchlist WHERE product_id = ?", (str(product_id),))
+        return cursor.rowcount == 1
+
+    def entries(self) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(f"SELECT {_ENTRY_COLUMNS} FROM watchlist ORDER BY next_run_at")
+        return [self._to_dict(row) for row in rows]
+
+    def due(self, now, limit) -> List[Dict[str, Any]]:
+        """Products whose next check is due, most overdue first."""
+        rows = self._connect().execute(
+            f"SELECT {_ENTRY_COLUMNS} FROM watchlist WHERE next_run_at <= ? ORDER BY next_run_at LIMIT ?",
+            (now, limit)
+        )
+        return [self._to_dict(row) for row in rows]
+
+    def snapshot(self, product_id) -> Dict[str, Any]:
+        row = self._connect().execute(
+            "SELECT snapshot FROM watchlist WHERE product_id = ?", (str(product_id),)
+        ).fetchone()
+        return json.loads(row["snapshot"]) if row and row["snapshot"] else {}
+
+    def record_check(self, product_id, interval, digest, snapshot=None, changed=False):
+        now = time.time()
+        assignments = ("interval = ?, next_run_at = ?, last_hash = ?, checks = checks + 1,"
+                       " last_checked_at = ?, last_error = NULL")
+        params = [interval, now + _jittered(interval), digest, now]
+        if snapshot is not None:
+            assignments += ", snapshot = ?"
+            params.append(json.dumps(snapshot, ensure_ascii=False))
+        if changed:
+            assignments += ", changes = changes + 1, last_changed_at = ?"
+            params.append(now)
+        self._connect().execute(
+            f"UPDATE watchlist SET {assignments} WHERE product_id = ?", (*params, str(product_id))
+        )
+
+    def record_error(self, product_id, error, retry_after):
+        now = time.time()
+        self._connect().execute(
+            "UPDATE watchlist SET errors = errors + 1, last_error = ?, last_checked_at = ?,"
+            " next_run_at = ? WHERE product_id = ?",
+            (error, now, now + retry_after, str(product_id))
+        )
+
+    @staticmethod
+    def _to_dict(row) -> Dict[str, Any]:
+        entry = dict(row)
+        entry["variants"] = json.loads(entry["variants"]) if entry["variants"] else None
+        return entry
+
+def _jittered(interval):
+    # Spread checks out so products added together do not stay in lockstep
+    return interval * random.uniform(0.9, 1.1)
+
+class DeltaSink:
+    """Appends change events to a JSONL file and/or POSTs them to a webhook."""
+
+    def __init__(self, path=None, webhook_url=None, timeout=10.0):
+        self.path = path
+        self.webhook_url = webhook_url
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def emit(self, event: Dict[str, Any]):
+        line = json.dumps(event, ensure_ascii=False)
+        if self.path:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        if self.webhook_url:
+            try:
+                requests.post(
+                    self.webhook_url, data=line.encode("utf-8"), timeout=self.timeout,
+                    headers={"Content-Type": "application/json"}
+                ).raise_for_status()
+            except requests.RequestException as e:
+                logger.warning(f"Delta webhook failed for product {event['product_id']}: {e}")
+
+class ChangeMonitor:
+    """Re-scrapes watched products and emits only what changed since the last check.
+
+    A product's interval shrinks by `change_factor` each time it changes and grows
+    by `unchanged_factor` each time it does not, within [min_interval, max_interval],
+    so the scrape budget follows the offers that actually move.
+    """
+
+    def __init__(self, store: WatchStore, sink: DeltaSink, concurrency, min_interval, max_interval,
+                 change_factor, unchanged_factor, error_retry, poll_interval):
+        self.store = store
+        self.sink = sink
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.change_factor = change_factor
+        self.unchanged_factor = unchanged_factor
+        self.error_retry = error_retry
+        self.poll_interval = poll_interval
+        self.counters = {"checks": 0, "unchanged": 0, "changed": 0, "errors": 0}
+
+    def _next_interval(self, interval, changed):
+        factor = self.change_factor if changed else self.unchanged_factor
+        return min(max(interval * factor, self.min_interval), self.max_interval)
+
+    async def check(self, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Check one watched product; returns the change event if it changed."""
+        product_id = entry["product_id"]
+        self.counters["checks"] += 1
+        try:
+            # Data scraped for API callers within the minimum interval is fresh enough
+            data = await get_product(product_id, entry["variants"], max_age=int(self.min_interval))
+        except Exception as e:
+            self.counters["errors"] += 1
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.warning(f"Monitor check of product {product_id} failed: {detail}")
+            await asyncio.to_thread(self.store.record_error, product_id, str(detail), self.error_retry)
+            return None
+
+        snapshot = normalize_payload(data)
+        digest = payload_hash(snapshot)
+        if entry["last_hash"] is None:
+            logger.info(f"Recorded baseline of product {product_id} ({len(snapshot)} fields)")
+            await asyncio.to_thread(self.store.record_check, product_id, entry["interval"], digest, snapshot)
+            return None
+        if digest == entry["last_hash"]:
+            self.counters["unchanged"] += 1
+            interval = self._next_interval(entry["interval"], changed=False)
+            await asyncio.to_thread(self.store.record_check, product_id, interval, digest)
+            return None
+
+        self.counters["changed"] += 1
+        previous = await asyncio.to_thread(self.store.snapshot, product_id)
+        event = {
+            "product_id": product_id,
+            "detected_at": time.time(),
+            "previous_checked_at": entry["last_checked_at"],
+            "hash": digest,
+            "changes": diff_snapshots(previous, snapshot),
+        }
+        interval = self._next_interval(entry["interval"], changed=True)
+        await asyncio.to_thread(self.sink.emit, event)
+        await asyncio.to_thread(self.store.record_check, product_id, interval, digest, snapshot, True)
+        logger.info(f"Product {product_id} changed ({', '.join(event['changes'])}); "
+                    f"next check in {interval:.0f}s")
+        return event
+
+    async def run_once(self) -> int:
+        """Check every product that is due now; returns how many were checked."""
+        checked = 0
+        while True:
+            due = await asyncio.to_thread(self.store.due, time.time(), self.concurrency)
+            if not due:
+                return checked
+            outcomes = await asyncio.gather(*(self.check(entry) for entry in due), return_exceptions=True)
+            for entry, outcome in zip(due, outcomes):
+                if isinstance(outcome, BaseException) and not isinstance(outcome, Exception):
+                    raise outcome
+                if isinstance(outcome, Exception):
+                    # Reschedule, or the product stays due and is picked again right away
+                    self.counters["errors"] += 1
+                    logger.error(f"Monitor check of product {entry['product_id']} crashed: {outcome}", exc_info=outcome)
+                    await asyncio.to_thread(self.store.record_error, entry["product_id"], str(outcome), self.error_retry)
+            checked += len(due)
+
+    async def run(self, stop: Optional[asyncio.Event] = None):
+        """Check due products until `stop` is set."""
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                await self.run_once()
+            except Exception as e:
+                # Keep monitoring; a store failure is retried after the poll interval
+                logger.exception(f"Monitor pass failed: {e}")
+            try:
+                await asyncio.wait_for(stop.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self):
+        return dict(self.counters)
+
+watch_store = WatchStore(settings.MONITOR_DB_PATH)
+
+change_monitor = ChangeMonitor(
+    store=watch_store,
+    sink=DeltaSink(settings.MONITOR_DELTA_PATH, settings.MONITOR_WEBHOOK_URL),
+    concurrency=settings.MONITOR_CONCURRENCY,
+    min_interval=settings.MONITOR_MIN_INTERVAL_SECONDS,
+    max_interval=settings.MONITOR_MAX_INTERVAL_SECONDS,
+    change_factor=settings.MONITOR_CHANGE_FACTOR,
+    unchanged_factor=settings.MONITOR_UNCHANGED_FACTOR,
+    error_retry=settings.MONITOR_ERROR_RETRY_SECONDS,
+    poll_interval=settings.MONITOR_POLL_INTERVAL,
+)
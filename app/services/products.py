@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.cache import CacheEntry, product_cache
+from app.services.scraper import VARIANTS, scrape_product_data
+from app.utils.concurrency import deadline_scope
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Background refreshes currently running, keyed by (product_id, variant)
+_refreshing = {}
+
+# Concurrent scrapes of the same product and variant set share one browser run
+scrape_flight = SingleFlight()
+
+async def _scrape_and_store(product_id, url_types) -> Dict[str, CacheEntry]:
+    async def scrape():
+        data = await scrape_product_data(product_id, url_types)
+        entries = {}
+        for url_type, value in data.items():
+            if settings.CACHE_ENABLED:
+                entries[url_type] = await product_cache.set(product_id, url_type, value)
+            else:
+                entries[url_type] = CacheEntry(value)
+        return entries
+
+    key = (str(product_id), tuple(sorted(url_types)))
+    return await scrape_flight.do(key, scrape)
+
+async def _refresh(product_id, url_types):
+    try:
+        # The refresh outlives the request that noticed the stale entry, and its deadline
+        with deadline_scope(None):
+            await _scrape_and_store(product_id, url_types)
+        product_cache.counters["refreshes"] += 1
+    except Exception as e:
+        product_cache.counters["refresh_errors"] += 1
+        logger.warning(f"Background refresh of product {product_id} {url_types} failed: {e}")
+    finally:
+        for url_type in url_types:
+            _refreshing.pop((product_id, url_type), None)
+
+def _schedule_refresh(product_id, url_types):
+    """Refresh stale variants in the background unless a refresh is already running."""
+    pending = [url_type for url_type in url_types if (product_id, url_type) not in _refreshing]
+    if not pending:
+        return
+    task = asyncio.create_task(_refresh(product_id, pending))
+    for url_type in pending:
+        _refreshing[(product_id, url_type)] = task
+
+async def get_product(
+    product_id: int,
+    variants: Optional[Iterable[str]] = None,
+    max_age: Optional[int] = None,
+    force_refresh: bool = False,
+    encoded: bool = False
+) -> Dict[str, Any]:
+    """Return product data, serving cached variants where possible.
+
+    `max_age` caps how old (in seconds) a cached variant may be; stale entries are
+    only served while revalidating when no `max_age` is given. With `encoded`,
+    each variant is returned as JSON bytes, reusing the encoding kept in the cache.
+    """
+    url_types = list(dict.fromkeys(variants)) if variants else list(VARIANTS)
+    if not settings.CACHE_ENABLED or force_refresh:
+        entries = await _scrape_and_store(product_id, url_types)
+        return _unwrap(entries, url_types, encoded)
+
+    result = {}
+    missing = []
+    stale = []
+    for url_type in url_types:
+        entry = await product_cache.get(product_id, url_type, max_age)
+        if entry is None:
+            missing.append(url_type)
+            continue
+        result[url_type] = entry
+        if not product_cache.is_fresh(entry):
+            stale.append(url_type)
+
+    if stale:
+        _schedule_refresh(product_id, stale)
+
+    if missing:
+        try:
+            result.update(await _scrape_and_store(product_id, missing))
+        except HTTPException as e:
+            # Cached variants are still returned, like a partial scrape
+            if not result:
+                raise
+            logger.warning(f"Failed to fetch {missing} for product {product_id}: {e.detail}")
+
+    return _unwrap(result, url_types, encoded)
+
+def _unwrap(entries, url_types, encoded):
+    return {
+        url_type: entries[url_type].encoded if encoded else entries[url_type].value
+        for url_type in url_types if url_type in entries
+    }
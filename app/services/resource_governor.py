@@ -0,0 +1,270 @@
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from app.core.config import settings
+from app.utils.browser_cache import browser_cache
+from app.utils.concurrency import scrape_executor
+from app.utils.driver_pool import driver_pool
+from app.utils.tabs import TabDriver
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Assumed footprint of one more browser until real ones have been measured
+DEFAULT_BROWSER_BYTES = 300 * MB
+
+def _driver_pids(driver):
+    """PIDs of the Chrome and chromedriver processes behind a driver."""
+    pids = []
+    for read in (lambda: driver.browser_pid, lambda: driver.service.process.pid):
+        try:
+            pids.append(read())
+        except Exception:
+            pass
+    return tuple(pids)
+
+def _user_data_dir(cmdline):
+    for arg in cmdline:
+        if arg.startswith("--user-data-dir="):
+            return arg.split("=", 1)[1]
+    return None
+
+def _is_scraper_process(info, temp_dir):
+    """Whether a process looks like a Chrome or chromedriver started by undetected-chromedriver.
+
+    Browsers are main Chrome processes (no --type) with remote debugging on a
+    profile under the temp directory; chromedrivers are patched binaries from the
+    browser cache or undetected-chromedriver's own data directory. Other Chrome
+    instances on the host never match.
+    """
+    cmdline = info.get("cmdline") or []
+    name = (info.get("name") or "").lower()
+    if "chromedriver" in name:
+        executable = cmdline[0] if cmdline else ""
+        return "undetected" in executable or os.path.realpath(executable) == os.path.realpath(browser_cache.driver_path)
+    if "chrom" not in name or any(arg.startswith("--type=") for arg in cmdline):
+        return False
+    user_data_dir = _user_data_dir(cmdline)
+    return (
+        any(arg.startswith("--remote-debugging-port=") for arg in cmdline)
+        and user_data_dir is not None
+        and os.path.realpath(user_data_dir).startswith(temp_dir + os.sep)
+    )
+
+class ResourceGovernor:
+    """Keeps the browsers within what the host can carry.
+
+    Every `interval` seconds it measures RSS and CPU of each pooled browser's
+    process tree (Chrome with its helpers, plus chromedriver) and recycles
+    browsers over `max_browser_rss`. It reaps Chrome and chromedriver processes
+    left behind by dead scraper processes, and by this one past `orphan_grace`.
+    It also moves the scrape concurrency limit: down while free memory or load
+    per CPU is past its bound, up by one while jobs queue and the host has room
+    for another browser.
+    """
+
+    def __init__(self, interval, max_browser_rss, min_free_memory, max_load_per_cpu, orphan_grace):
+        self.interval = interval
+        self.max_browser_rss = max_browser_rss
+        self.min_free_memory = min_free_memory
+        self.max_load_per_cpu = max_load_per_cpu
+        self.orphan_grace = orphan_grace
+        # Kept between checks so cpu_percent() measures over the interval
+        self._processes = {}
+        self.counters = {"checks": 0, "recycled": 0, "reaped": 0, "limit_decreases": 0, "limit_increases": 0}
+        self.last = {}
+
+    def stats(self):
+        return {
+            "enabled": psutil is not None and settings.GOVERNOR_ENABLED,
+            **self.counters,
+            **self.last,
+            "concurrency_limit": scrape_executor.limit,
+        }
+
+    def _process(self, pid):
+        process = self._processes.get(pid)
+        if process is None or not process.is_running():
+            process = self._processes[pid] = psutil.Process(pid)
+            # The first call only sets the baseline
+            process.cpu_percent(None)
+        return process
+
+    def _tree(self, pids):
+        tree = {}
+        for pid in pids:
+            try:
+                root = self._process(pid)
+                tree[root.pid] = root
+                for child in root.children(recursive=True):
+                    tree[child.pid] = self._process(child.pid)
+            except psutil.Error:
+                continue
+        return tree
+
+    def measure_browsers(self):
+        """Measure each pooled browser; tabs of one Chrome are grouped together.
+
+        Returns dicts with the pool `entries`, the `pids` of the tree, `rss` in
+        bytes and `cpu` in percent of one core.
+        """
+        browsers = {}
+        for entry, _ in driver_pool.entries():
+            pids = _driver_pids(entry.driver)
+            if pids:
+                browsers.setdefault(pids, []).append(entry)
+        measured = []
+        for pids, entries in browsers.items():
+            tree = self._tree(pids)
+            rss = cpu = 0
+            for process in tree.values():
+                try:
+                    rss += process.memory_info().rss
+                    cpu += process.cpu_percent(None)
+                except psutil.Error:
+                    continue
+            measured.append({"entries": entries, "pids": set(tree), "rss": rss, "cpu": cpu})
+        # Forget processes that are gone
+        live = set().union(*(browser["pids"] for browser in measured))
+        self._processes = {pid: process for pid, process in self._processes.items() if pid in live}
+        return measured
+
+    def recycle(self, browser):
+        """Retire every pool entry of a browser; idle ones close now, busy ones after their scrape."""
+        for entry in browser["entries"]:
+            if isinstance(entry.driver, TabDriver):
+                entry.driver.retire_browser()
+            driver_pool.retire(entry)
+        self.counters["recycled"] += 1
+        logger.warning(f"Recycling browser using {browser['rss'] / MB:.0f} MB")
+
+    def reap_orphans(self, tracked_pids):
+        """Kill scraper Chrome and chromedriver processes that no live driver owns."""
+        me = os.getpid()
+        temp_dir = os.path.realpath(tempfile.gettempdir())
+        now = time.time()
+        reaped = 0
+        for process in psutil.process_iter(["pid", "ppid", "name", "cmdline", "create_time"]):
+            info = process.info
+            if info["pid"] in tracked_pids or now - (info["create_time"] or now) < self.orphan_grace:
+                continue
+            # Drivers being launched are not in the pool yet; the grace period covers them
+            parent_gone = info["ppid"] in (0, 1) or not psutil.pid_exists(info["ppid"])
+            if not (parent_gone or info["ppid"] == me) or not _is_scraper_process(info, temp_dir):
+                continue
+            logger.warning(f"Reaping orphaned {info['name']} process {info['pid']}")
+            self._kill_tree(process)
+            user_data_dir = _user_data_dir(info["cmdline"] or [])
+            if user_data_dir and os.path.basename(user_data_dir).startswith("chrome-profile-"):
+                # A clone of the template profile; nothing else uses it
+                shutil.rmtree(user_data_dir, ignore_errors=True)
+            reaped += 1
+        self.counters["reaped"] += reaped
+        return reaped
+
+    def _kill_tree(self, process):
+        try:
+            processes = [process] + process.children(recursive=True)
+        except psutil.Error:
+            processes = [process]
+        for member in processes:
+            try:
+                member.terminate()
+            except psutil.Error:
+                pass
+        _, alive = psutil.wait_procs(processes, timeout=3)
+        for member in alive:
+            try:
+                member.kill()
+            except psutil.Error:
+                pass
+
+    def target_limit(self, browser_bytes):
+        """Concurrency limit for the current free memory and load."""
+        limit = scrape_executor.limit
+        available = psutil.virtual_memory().available
+        load_per_cpu = psutil.getloadavg()[0] / (psutil.cpu_count() or 1)
+        self.last.update({
+            "available_memory_mb": round(available / MB),
+            "load_per_cpu": round(load_per_cpu, 2),
+        })
+        if available < self.min_free_memory / 2:
+            # Close to OOM territory; back off hard
+            return limit // 2
+        if available < self.min_free_memory or load_per_cpu > self.max_load_per_cpu:
+            return limit - 1
+        queued = scrape_executor.stats()["waiting"] > 0
+        room = available - browser_bytes > self.min_free_memory and load_per_cpu < self.max_load_per_cpu * 0.8
+        if queued and room:
+            return limit + 1
+        return limit
+
+    def check(self):
+        """Measure, recycle and reap once; returns the concurrency limit to apply."""
+        browsers = self.measure_browsers()
+        for browser in browsers:
+            if browser["rss"] > self.max_browser_rss:
+                self.recycle(browser)
+        tracked = set().union(*(browser["pids"] for browser in browsers))
+        self.reap_orphans(tracked)
+        self.counters["checks"] += 1
+        total_rss = sum(browser["rss"] for browser in browsers)
+        self.last.update({
+            "browsers": len(browsers),
+            "browser_rss_bytes": total_rss,
+            "browser_cpu_percent": round(sum(browser["cpu"] for browser in browsers), 1),
+        })
+        browser_bytes = total_rss / len(browsers) if browsers else DEFAULT_BROWSER_BYTES
+        return self.target_limit(browser_bytes)
+
+    def apply_limit(self, limit):
+        """Set the concurrency limit on the event loop.
+
+        Returns the idle pool entries beyond a lowered limit, to be retired so
+        their memory is given back.
+        """
+        previous = scrape_executor.limit
+        scrape_executor.set_limit(limit)
+        if scrape_executor.limit == previous:
+            return []
+        logger.info(f"Scrape concurrency limit {previous} -> {scrape_executor.limit} ({self.last})")
+        if scrape_executor.limit > previous:
+            self.counters["limit_increases"] += 1
+            return []
+        self.counters["limit_decreases"] += 1
+        entries = driver_pool.entries()
+        excess = len(entries) - scrape_executor.limit
+        return [entry for entry, in_use in entries if not in_use][:max(excess, 0)]
+
+    async def run(self):
+        """Govern until cancelled; does nothing without psutil."""
+        if psutil is None:
+            logger.warning("psutil is not installed; the resource governor is disabled")
+            return
+        while True:
+            try:
+                limit = await asyncio.to_thread(self.check)
+                # The executor's slot bookkeeping lives on the event loop; quitting browsers does not
+                for entry in self.apply_limit(limit):
+                    await asyncio.to_thread(driver_pool.retire, entry)
+            except Exception as e:
+                logger.exception(f"Resource governor check failed: {e}")
+            await asyncio.sleep(self.interval)
+
+resource_governor = ResourceGovernor(
+    interval=settings.GOVERNOR_INTERVAL,
+    max_browser_rss=settings.GOVERNOR_BROWSER_MAX_RSS_MB * MB,
+    min_free_memory=settings.GOVERNOR_MIN_FREE_MEMORY_MB * MB,
+    max_load_per_cpu=settings.GOVERNOR_MAX_LOAD_PER_CPU,
+    orphan_grace=settings.GOVERNOR_ORPHAN_GRACE_SECONDS,
+)
@@ -0,0 +1,103 @@
+from app.services.cache import product_cache
+from app.services.fast_path import fast_path
+from app.services.jobs import job_store
+from app.services.products import scrape_flight
+from app.services.resource_governor import resource_governor
+from app.utils.concurrency import scrape_executor
+from app.utils.driver_pool import driver_pool, tabbed_browsers
+from app.utils.metrics import counter_callback, gauge_callback, registry
+from app.utils.proxies import proxy_pool
+from app.utils.rate_limiter import rate_limiter
+from app.utils.sessions import session_store
+
+def _labelled(stats, names):
+    """Map selected keys of a stats() dict to single-label samples."""
+    return {(name,): stats[name] for name in names if name in stats}
+
+# Gauges and counters read from the stats() of the long-lived singletons at scrape time
+gauge_callback(
+    "scraper_driver_pool_drivers", "Drivers in the pool by state",
+    lambda: _labelled(driver_pool.stats(), ("idle", "in_use", "starting")), ("state",)
+)
+gauge_callback(
+    "scraper_driver_pool_max_size", "Maximum number of pooled drivers",
+    lambda: driver_pool.stats()["max_size"]
+)
+gauge_callback(
+    "scraper_browser_processes", "Chrome processes shared by pooled tabs (tab mode only)",
+    lambda: tabbed_browsers.stats()["browsers"]
+)
+gauge_callback(
+    "scraper_executor_jobs", "Blocking scrape jobs by state",
+    lambda: _labelled(scrape_executor.stats(), ("running", "waiting")), ("state",)
+)
+gauge_callback(
+    "scraper_executor_concurrency_limit", "Concurrent scrape jobs currently allowed by the resource governor",
+    lambda: scrape_executor.limit
+)
+gauge_callback(
+    "scraper_browser_memory_bytes", "RSS of the pooled browsers' process trees at the last governor check",
+    lambda: resource_governor.last.get("browser_rss_bytes")
+)
+counter_callback(
+    "scraper_governor_actions_total", "Browsers recycled over the RSS limit and orphaned processes reaped",
+    lambda: _labelled(resource_governor.counters, ("recycled", "reaped")), ("action",)
+)
+counter_callback(
+    "scraper_admission_rejections_total", "Scrape jobs rejected by admission control",
+    lambda: {
+        ("queue_full",): scrape_executor.counters["rejected_queue_full"],
+        ("deadline",): scrape_executor.counters["rejected_deadline"],
+    },
+    ("reason",)
+)
+gauge_callback(
+    "scraper_single_flight_in_flight", "Distinct scrapes currently in flight",
+    lambda: scrape_flight.stats()["in_flight"]
+)
+counter_callback(
+    "scraper_single_flight_calls_total", "Scrape calls executed or joined to one in flight",
+    lambda: _labelled(scrape_flight.stats(), ("executed", "deduplicated")), ("outcome",)
+)
+counter_callback(
+    "scraper_cache_lookups_total", "Result cache lookups by outcome",
+    lambda: _labelled(product_cache.stats(), ("memory_hits", "disk_hits", "stale_hits", "misses")), ("outcome",)
+)
+gauge_callback(
+    "scraper_cache_memory_entries", "Entries held in the in-memory result cache",
+    lambda: product_cache.stats()["memory_entries"]
+)
+counter_callback(
+    "scraper_fast_path_requests_total", "HTTP fast path requests by outcome",
+    lambda: _labelled(fast_path.stats(), ("hits", "captcha", "missing_payload", "errors", "skipped")),
+    ("outcome",)
+)
+gauge_callback(
+    "scraper_proxies", "Configured proxies by state",
+    lambda: _labelled(proxy_pool.stats(), ("healthy", "quarantined")), ("state",)
+)
+gauge_callback(
+    "scraper_proxy_rate_rps", "Current adaptive request rate of each proxy",
+    lambda: {(proxy.server,): proxy.rate_limiter.stats().get("rate") for proxy in proxy_pool.proxies},
+    ("proxy",)
+)
+gauge_callback(
+    "scraper_rate_limit_rps", "Current adaptive request rate",
+    lambda: rate_limiter.stats().get("rate")
+)
+gauge_callback(
+    "scraper_rate_limit_captcha_ratio", "Share of captchas over the rate limiter window",
+    lambda: rate_limiter.stats().get("captcha_ratio")
+)
+gauge_callback(
+    "scraper_sessions_active", "Stored browser sessions that passed the captcha",
+    lambda: session_store.stats()["active"]
+)
+gauge_callback(
+    "scraper_jobs", "Durable jobs by status",
+    lambda: {(status,): n for status, n in job_store.counts().items()}, ("status",)
+)
+
+def render_metrics():
+    """Render the process metrics in the Prometheus text exposition format."""
+    return registry.render()
@@ -1,22 +1,58 @@
 from fastapi import HTTPException
+import asyncio
 import logging
 import time
-from typing import Dict, Any
-from bs4 import BeautifulSoup
-import json
-import re
+from typing import Dict, Any, Iterable, Optional
 import tenacity
+from selenium.common.exceptions import TimeoutException, WebDriverException
 
-from app.utils.driver import get_driver
+from app.core.config import settings
+from app.services.archive import archive_page
+from app.services.fast_path import fast_path
+from app.utils.driver_pool import driver_pool
 from app.utils.captcha_solver import is_captcha_page, solve_captcha
+from app.utils.concurrency import (
+    DeadlineExceeded, ScrapeCancelled, ScrapeRejected, check_cancelled, clamp_timeout,
+    scrape_executor, sleep, stop_at_deadline
+)
+from app.utils.extractor import extract_json_data, extract_title, snapshot_page
+from app.utils.metrics import CAPTCHA_OUTCOMES, PAGE_BYTES, RETRIES, STAGE_SECONDS, VARIANT_RESULTS, VARIANT_SECONDS
+from app.utils.network import read_network_usage, reset_network_log
+from app.utils.proxies import limiter_for, proxy_pool, record_outcome
+from app.utils.rate_limiter import OUTCOME_CAPTCHA, OUTCOME_FAILED, OUTCOME_OK
+from app.utils.readiness import wait_for_page_ready
+from app.utils.sessions import session_store
+from app.utils.timing import count, report_timings, stage, track_stages
 
 logger = logging.getLogger(__name__)
 
+def _before_retry(operation, description):
+    """Build a tenacity before_sleep hook that logs and counts the retry."""
+    def before_sleep(retry_state):
+        RETRIES.inc(operation=operation)
+        logger.info(f"Retrying {description} {retry_state.attempt_number}/3...")
+    return before_sleep
+
+BASE_URL = settings.PRODUCT_BASE_URL.rstrip("/")
+
+# Product page variants and the `sk` query value that selects them
+VARIANTS = {
+    "retail": "order",
+    "wholesale": "consign"
+}
+
+def build_product_url(product_id, url_type):
+    """Build the detail page URL of a product variant."""
+    return f"{BASE_URL}/{product_id}.html?sk={VARIANTS[url_type]}"
+
 @tenacity.retry(
-    stop=tenacity.stop_after_attempt(3),
+    stop=tenacity.stop_after_attempt(3) | stop_at_deadline(settings.DEADLINE_MIN_ATTEMPT_SECONDS),
     wait=tenacity.wait_exponential(multiplier=1, min=1, max=3),
     retry=tenacity.retry_if_result(lambda result: result is False),
-    before_sleep=lambda retry_state: logger.info(f"Retrying captcha solve {retry_state.attempt_number}/3...")
+    # Out of attempts, return the last False rather than raising RetryError
+    retry_error_callback=lambda retry_state: retry_state.outcome.result(),
+    sleep=sleep,
+    before_sleep=_before_retry("captcha_solve", "captcha solve")
 )
 def solve_captcha_with_retry(driver):
     """Attempt to solve the captcha with retry logic."""
@@ -31,94 +67,174 @@ def solve_captcha_with_retry(driver):
         logger.info("Captcha solved")
     return result
 
-def extract_json_data(html_content):
-    """Extract the JSON data from the script tag.""" 
-    # Pattern to match the entire script tag containing window.__GLOBAL_DADA
-    pattern = re.compile(r'<script[^>]*>(.*?window\.__GLOBAL_DADA\s*=.*?)</script>', re.DOTALL)
-    logger.info("Looking for product data.")
-    # Find the match in the page source
-    match = pattern.search(html_content)
-    
-    if match:
-        # Extract the entire script content
-        script_content = match.group(1)
-        return script_content.strip()
-    else:
-        logger.warning("No window.__GLOBAL_DADA found in the page source")
-        return None
-
 @tenacity.retry(
-    stop=tenacity.stop_after_attempt(3),
+    stop=tenacity.stop_after_attempt(3) | stop_at_deadline(settings.DEADLINE_MIN_ATTEMPT_SECONDS),
     wait=tenacity.wait_exponential(multiplier=1, min=2, max=10),
     retry=tenacity.retry_if_exception_type(HTTPException),
-    before_sleep=lambda retry_state: logger.info(f"Retrying page fetch {retry_state.attempt_number}/3...")
+    # Callers get the last HTTPException (403, 404, 504), not tenacity's RetryError
+    reraise=True,
+    sleep=sleep,
+    before_sleep=_before_retry("page_fetch", "page fetch")
 )
-async def fetch_url_with_retry(driver, url, url_type):
-    """Fetch a single URL with retry logic for captcha handling."""
+def fetch_url_with_retry(driver, url, url_type, product_id=None):
+    """Fetch a single URL with retry logic for captcha handling.
+
+    Blocking: runs on a scrape worker thread, never on the event loop. Pages
+    are archived under product_id when the page archive is enabled.
+    """
     logger.info(f"Fetching data from {url_type} URL: {url}")
+    check_cancelled()
     
-    driver.get(url)
-    time.sleep(3)  # Initial wait for page to load
+    proxy = getattr(driver, "proxy", None)
+    with stage("throttle"):
+        limiter_for(proxy).acquire()
+    reset_network_log(driver)
+    started = time.perf_counter()
+    with stage("navigate"):
+        # A pooled driver keeps its timeout, so set it on every navigation
+        driver.set_page_load_timeout(max(clamp_timeout(settings.PAGE_LOAD_TIMEOUT), 1))
+        try:
+            driver.get(url)
+        except TimeoutException:
+            check_cancelled()
+            proxy_pool.record(proxy, OUTCOME_FAILED)
+            raise HTTPException(status_code=504, detail=f"Timed out loading {url_type} page")
+        except WebDriverException:
+            # Connection errors such as net::ERR_PROXY_CONNECTION_FAILED
+            proxy_pool.record(proxy, OUTCOME_FAILED)
+            raise
+    # Return as soon as the payload or the captcha is on the page
+    with stage("page_ready"):
+        state = wait_for_page_ready(driver)
+    load_seconds = time.perf_counter() - started
 
     # Check if we hit a captcha page
-    if is_captcha_page(driver):
+    challenged = state == "captcha" or (state == "timeout" and is_captcha_page(driver))
+    if challenged:
         logger.info("Captcha page detected. Attempting to solve with retries...")
-        if not solve_captcha_with_retry(driver):
-            logger.error("Failed to solve captcha after multiple attempts")
-            raise HTTPException(status_code=403, detail="Captcha challenge failed")
-        
-        # Wait a bit after captcha is solved
-        time.sleep(2)
+        CAPTCHA_OUTCOMES.inc(outcome="challenged")
+        record_outcome(proxy, OUTCOME_CAPTCHA)
+        session_store.record(driver, challenged=True)
+        with stage("captcha"):
+            if not solve_captcha_with_retry(driver):
+                logger.error("Failed to solve captcha after multiple attempts")
+                CAPTCHA_OUTCOMES.inc(outcome="failed")
+                raise HTTPException(status_code=403, detail="Captcha challenge failed")
+            
+            CAPTCHA_OUTCOMES.inc(outcome="solved")
+            # Keep the cleared session so later drivers can skip the slider
+            if settings.SESSION_STORE_ENABLED:
+                session_store.save_from_driver(driver)
+            
+            # Wait for the product page to come back after the captcha
+            wait_for_page_ready(driver)
     
     # Extract JSON data from the page
-    page_source = driver.page_source
-    data = extract_json_data(page_source)
+    with stage("extract"):
+        if settings.EXTRACT_IN_PAGE:
+            snapshot = snapshot_page(driver, include_source=settings.ARCHIVE_ENABLED)
+            data, page_source, title = snapshot["data"], snapshot["source"], snapshot["title"]
+        else:
+            page_source = driver.page_source
+            data = extract_json_data(page_source)
+            title = extract_title(page_source)
+    
+    # Captcha pages are not worth keeping for re-extraction
+    if data or "Captcha Interception" not in (title or ""):
+        archive_page(product_id, url_type, page_source, "browser", extracted=bool(data))
+    
+    usage = read_network_usage(driver)
+    if usage is not None:
+        count("browser_bytes", usage["bytes"])
+        count("requests_blocked", usage["blocked"])
     
     if not data:
-        soup = BeautifulSoup(page_source, 'html.parser')
-        title_tag = soup.find('title')
-        title = title_tag.text if title_tag else "Unknown page"
-        logger.error(f"Failed to extract data from {url_type}. Page title: {title}")
+        record_outcome(proxy, OUTCOME_FAILED)
+        logger.error(f"Failed to extract data from {url_type}. Page title: {title or 'Unknown page'}")
         raise HTTPException(status_code=404, detail=f"Could not extract data from {url_type}")
     
+    record_outcome(proxy, OUTCOME_OK, load_seconds)
+    if not challenged:
+        session_store.record(driver, challenged=False)
     return data
 
-async def scrape_product_data(product_id: str) -> Dict[str, Any]:
-    """Fetch product data from both retail and wholesale endpoints."""
-    base_url = "https://detail.1688.com/offer"
-    urls = {
-        "retail": f"{base_url}/{product_id}.html?sk=order",
-        "wholesale": f"{base_url}/{product_id}.html?sk=consign"
-    }
+def _fetch_variant(product_id: str, url: str, url_type: str):
+    """Fetch one variant over the HTTP fast path or a pooled driver; returns (data, path)."""
+    # Try a plain HTTP fetch with a harvested session before starting a browser
+    if settings.HTTP_FAST_PATH_ENABLED:
+        with stage("fast_path"):
+            data = fast_path.fetch(url, url_type, product_id)
+        if data is not None:
+            return data, "fast_path"
     
-    result = {}
-    driver = None
-    
-    try:
-        driver = get_driver()
-        
-        for url_type, url in urls.items():
-            try:
-                data = await fetch_url_with_retry(driver, url, url_type)
-                result[url_type] = data
-            except HTTPException as e:
-                logger.warning(f"Failed to fetch {url_type} data: {str(e)}")
-                # Continue to next URL type even if this one fails
-            except Exception as e:
-                logger.exception(f"Unexpected error fetching {url_type}: {e}")
+    check_cancelled()
+    with stage("checkout"):
+        driver = driver_pool.checkout()
+    # Borrow a warm driver from the pool; it is checked back in for reuse
+    with driver_pool.driver(driver):
+        data = fetch_url_with_retry(driver, url, url_type, product_id)
+        if settings.HTTP_FAST_PATH_ENABLED and fast_path.needs_harvest():
+            fast_path.harvest(driver)
+        return data, "browser"
+
+def _record_variant(product_id, url_type, result, elapsed, timer):
+    """Log and export the timings of one variant fetch."""
+    logger.info(f"Stage timings for {product_id} {url_type} ({result}): {timer}")
+    VARIANT_RESULTS.inc(variant=url_type, result=result)
+    VARIANT_SECONDS.observe(elapsed, variant=url_type, result=result)
+    for name, seconds in timer.stages.items():
+        STAGE_SECONDS.observe(seconds, stage=name)
+    PAGE_BYTES.inc(timer.counters.get("fast_path_bytes", 0), path="fast_path")
+    PAGE_BYTES.inc(timer.counters.get("browser_bytes", 0), path="browser")
+    report_timings(url_type, timer, result=result, total=round(elapsed, 3))
+
+def _scrape_variant(product_id: str, url_type: str):
+    """Blocking fetch of one product variant, run on a scrape worker thread."""
+    url = build_product_url(product_id, url_type)
+    result = "error"
+    started = time.perf_counter()
+    with track_stages() as timer:
+        try:
+            data, result = _fetch_variant(product_id, url, url_type)
+            return data
+        except DeadlineExceeded:
+            result = "deadline"
+            raise
+        except ScrapeCancelled:
+            result = "cancelled"
+            raise
+        except HTTPException as e:
+            result = f"http_{e.status_code}"
+            raise
+        finally:
+            _record_variant(product_id, url_type, result, time.perf_counter() - started, timer)
+
+async def scrape_product_data(product_id: str, variants: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Fetch product data from the retail and/or wholesale endpoints in parallel."""
+    url_types = list(dict.fromkeys(variants)) if variants else list(VARIANTS)
+    outcomes = await asyncio.gather(
+        *(scrape_executor.run(_scrape_variant, product_id, url_type) for url_type in url_types),
+        return_exceptions=True
+    )
     
-    except Exception as e:
-        logger.exception(f"Error in scrape_product_data: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    result = {}
+    unexpected_error = None
     
-    finally:
-        try:
-            if driver:
-                driver.quit()
-        except Exception as e:
-            logger.error(f"Error closing driver: {e}")
+    for url_type, outcome in zip(url_types, outcomes):
+        if isinstance(outcome, (ScrapeCancelled, ScrapeRejected, asyncio.CancelledError)):
+            raise outcome
+        if isinstance(outcome, HTTPException):
+            logger.warning(f"Failed to fetch {url_type} data: {str(outcome)}")
+            # Other variants are still returned even if this one fails
+        elif isinstance(outcome, Exception):
+            logger.error(f"Unexpected error fetching {url_type}: {outcome}", exc_info=outcome)
+            unexpected_error = outcome
+        else:
+            result[url_type] = outcome
     
     if not result:
+        if unexpected_error is not None:
+            raise HTTPException(status_code=500, detail=str(unexpected_error))
         raise HTTPException(status_code=404, detail="Could not fetch product data from any endpoint")
     
     return result
\ No newline at end of file
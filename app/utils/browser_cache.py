@@ -0,0 +1,108 @@
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import undetected_chromedriver as uc
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Profile entries that are per-process state or caches rather than settings worth cloning
+_PROFILE_IGNORE = shutil.ignore_patterns(
+    "Singleton*", "*.lock", "lockfile", "Crashpad", "Cache", "Code Cache", "GPUCache",
+    "ShaderCache", "GrShaderCache", "DawnCache", "component_crx_cache"
+)
+
+class BrowserCache:
+    """Patched chromedriver binary and template Chrome profile kept on local disk.
+
+    Without it every driver start has undetected-chromedriver download and patch
+    chromedriver, and Chrome build a new profile from scratch. With it the binary
+    is patched once per Chrome version and each browser starts from a copy of a
+    profile that has already been through first-run initialisation.
+    """
+
+    def __init__(self, directory, version_main=None):
+        self.directory = directory
+        self.version_main = version_main
+        self._lock = threading.RLock()
+
+    @property
+    def driver_path(self):
+        return os.path.join(self.directory, "chromedriver.exe" if sys.platform == "win32" else "chromedriver")
+
+    @property
+    def template_dir(self):
+        return os.path.join(self.directory, "profile-template")
+
+    def stats(self):
+        return {
+            "driver_cached": os.path.isfile(self.driver_path),
+            "profile_template": os.path.isdir(self.template_dir),
+        }
+
+    def ensure_driver(self):
+        """Return the cached patched chromedriver, downloading and patching it if missing."""
+        with self._lock:
+            if os.path.isfile(self.driver_path):
+                return self.driver_path
+            os.makedirs(self.directory, exist_ok=True)
+            patcher = uc.Patcher(version_main=self.version_main or 0)
+            patcher.auto()
+            # Copy rather than move: the patcher deletes its own binary when collected
+            tmp_path = f"{self.driver_path}.{os.getpid()}.tmp"
+            shutil.copy2(patcher.executable_path, tmp_path)
+            os.replace(tmp_path, self.driver_path)
+            logger.info(f"Cached patched chromedriver at {self.driver_path}")
+            return self.driver_path
+
+    def invalidate_driver(self):
+        """Drop the cached binary, e.g. after Chrome was upgraded past its version."""
+        with self._lock:
+            try:
+                os.remove(self.driver_path)
+            except FileNotFoundError:
+                pass
+
+    def ensure_template(self, build_options):
+        """Build the template profile by starting Chrome on it once, if it is missing.
+
+        `build_options` returns fresh ChromeOptions for the one-off template browser.
+        """
+        with self._lock:
+            if os.path.isdir(self.template_dir):
+                return self.template_dir
+            os.makedirs(self.directory, exist_ok=True)
+            building = tempfile.mkdtemp(prefix="profile-build-", dir=self.directory)
+            driver = uc.Chrome(
+                options=build_options(), user_data_dir=building,
+                driver_executable_path=self.ensure_driver(), version_main=self.version_main
+            )
+            try:
+                driver.get("about:blank")
+            finally:
+                driver.quit()
+            try:
+                os.rename(building, self.template_dir)
+            except OSError:
+                # Another process finished its template first
+                shutil.rmtree(building, ignore_errors=True)
+            logger.info(f"Built template Chrome profile at {self.template_dir}")
+            return self.template_dir
+
+    def clone_profile(self):
+        """Copy the template profile into a new directory for one browser instance."""
+        target = tempfile.mkdtemp(prefix="chrome-profile-")
+        shutil.copytree(self.template_dir, target, ignore=_PROFILE_IGNORE, dirs_exist_ok=True)
+        return target
+
+    def prepare(self, build_options):
+        """Make sure the binary and the template profile exist; safe to call repeatedly."""
+        self.ensure_driver()
+        self.ensure_template(build_options)
+
+browser_cache = BrowserCache(settings.BROWSER_CACHE_DIR, settings.CHROME_VERSION_MAIN)
@@ -6,6 +6,11 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 
+from app.utils.concurrency import ScrapeCancelled, clamp_timeout
+from app.utils.metrics import CAPTCHA_OUTCOMES
+from app.utils.readiness import wait_for_captcha_verdict
+from app.utils.tabs import exclusive
+
 logger = logging.getLogger(__name__)
 
 def is_captcha_page(driver):
@@ -21,13 +26,14 @@ def solve_captcha(driver):
     logger.info("Attempting to solve captcha...")
     try:
         # Wait for the slider to appear
-        slider = WebDriverWait(driver, 10).until(
+        slider = WebDriverWait(driver, clamp_timeout(10)).until(
             EC.presence_of_element_located((By.ID, "nc_1_n1z"))
         )
         
-        # Get the slider track
+        # Get the slider track; element commands need its tab focused
         slider_track = driver.find_element(By.ID, "nc_1_n1t")
-        track_width = slider_track.size['width']
+        with exclusive(driver):
+            track_width = slider_track.size['width']
         
         # Move the slider
         action = ActionChains(driver)
@@ -53,13 +59,20 @@ def solve_captcha(driver):
             action.move_by_offset(move, random.uniform(-1, 1))
             time.sleep(random.uniform(0.01, 0.05))  # Random short delay between movements
         
-        # Release at the end
-        action.release().perform()
-        time.sleep(2)  # Wait for verification to complete
+        # Release at the end; the whole drag is sent as one command
+        with exclusive(driver):
+            action.release().perform()
+        # Wait only as long as verification actually takes
+        verdict = wait_for_captcha_verdict(driver)
+        logger.info(f"Captcha verdict: {verdict or 'unknown'}")
+        CAPTCHA_OUTCOMES.inc(outcome=f"verdict_{verdict or 'unknown'}")
         
-        driver.refresh()
+        if is_captcha_page(driver):
+            driver.refresh()
         return True
     
+    except ScrapeCancelled:
+        raise
     except Exception as e:
         logger.error(f"Error solving captcha: {e}")
         return False
\ No newline at end of file
@@ -0,0 +1,275 @@
+import asyncio
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Cancellation flag of the scrape running in the current worker thread
+_cancel_event = contextvars.ContextVar("scrape_cancel_event", default=None)
+
+# Deadline of the current request, if it has one
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+class ScrapeCancelled(Exception):
+    """Raised inside a worker thread when its scrape has been cancelled."""
+
+class DeadlineExceeded(ScrapeCancelled):
+    """Raised when the request deadline leaves no time for the next step."""
+
+class ScrapeRejected(Exception):
+    """Raised by admission control when the scrape queue is over capacity."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class Deadline:
+    """The time.monotonic() by which work must be done, or None for no limit.
+
+    Work shared by several callers runs under one Deadline that each joining
+    caller extends to its own, so it lasts as long as the most patient of them.
+    """
+
+    __slots__ = ("at",)
+
+    def __init__(self, at):
+        self.at = at
+
+    def extend(self, at):
+        if self.at is not None and (at is None or at > self.at):
+            self.at = at
+
+def current_deadline():
+    """time.monotonic() of the current deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline.at
+
+@contextmanager
+def deadline_scope(seconds):
+    """Give the scrapes started in this context `seconds` to finish; None lifts the deadline."""
+    token = _deadline.set(None if seconds is None else Deadline(time.monotonic() + seconds))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+@contextmanager
+def shared_deadline_scope(deadline):
+    """Run this context under a Deadline that other callers may extend."""
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining():
+    """Seconds left before the current deadline, or None without one."""
+    at = current_deadline()
+    return None if at is None else at - time.monotonic()
+
+def clamp_timeout(timeout):
+    """Shorten a timeout so it ends no later than the current deadline."""
+    left = remaining()
+    return timeout if left is None else max(min(timeout, left), 0.0)
+
+def check_cancelled():
+    """Raise ScrapeCancelled if the current scrape has been cancelled or is out of time."""
+    event = _cancel_event.get()
+    if event is not None and event.is_set():
+        raise ScrapeCancelled("Scrape cancelled")
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+
+def sleep(seconds):
+    """Sleep in a worker thread, waking up early if the scrape is cancelled.
+
+    A sleep that would outlast the request deadline raises DeadlineExceeded
+    right away instead; the worker is better used elsewhere.
+    """
+    if clamp_timeout(seconds) < seconds:
+        raise DeadlineExceeded(f"Request deadline leaves too little time to wait {seconds:.1f}s")
+    event = _cancel_event.get()
+    if event is None:
+        time.sleep(seconds)
+    elif event.wait(seconds):
+        raise ScrapeCancelled("Scrape cancelled")
+
+def stop_at_deadline(min_attempt_seconds):
+    """Tenacity stop condition raising DeadlineExceeded when another attempt cannot finish in time."""
+    def stop(retry_state):
+        left = remaining()
+        if left is not None and left < min_attempt_seconds:
+            raise DeadlineExceeded(
+                f"Request deadline leaves {max(left, 0):.1f}s, too little for attempt {retry_state.attempt_number + 1}"
+            )
+        return False
+    return stop
+
+class ScrapeExecutor:
+    """Runs blocking scrape work on a bounded thread pool off the event loop.
+
+    Jobs submitted with a request deadline go through admission control: they
+    are rejected up front when `max_queue` jobs are already waiting, or when the
+    expected wait for a worker would use up their deadline. At most `limit` jobs
+    run at once; it starts at `max_workers` and can be lowered and raised again
+    at runtime, e.g. by the resource governor.
+    """
+
+    def __init__(self, max_workers, max_queue=None, initial_job_seconds=10.0):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.limit = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape")
+        # Jobs holding a slot, and futures of callers waiting for one in FIFO order
+        self._busy = 0
+        self._slot_waiters = deque()
+        self._waiting = 0
+        self._running = 0
+        # Moving average of job durations, used to estimate queueing delay
+        self._job_seconds = initial_job_seconds
+        self.counters = {"rejected_queue_full": 0, "rejected_deadline": 0}
+
+    def stats(self):
+        """Return the number of running and waiting scrape jobs."""
+        return {
+            "running": self._running,
+            "waiting": self._waiting,
+            "max_workers": self.max_workers,
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "avg_job_seconds": round(self._job_seconds, 3),
+            **self.counters,
+        }
+
+    def expected_wait(self):
+        """Estimated seconds a new job would wait for a free worker."""
+        backlog = self._waiting + self._running - self.limit + 1
+        return max(backlog, 0) * self._job_seconds / self.limit
+
+    def set_limit(self, limit):
+        """Allow `limit` concurrent jobs, between 1 and max_workers; call it on the event loop.
+
+        Lowering the limit does not interrupt running jobs, it only holds back new ones.
+        """
+        self.limit = min(max(int(limit), 1), self.max_workers)
+        self._wake_slot_waiters()
+
+    async def _acquire_slot(self):
+        if self._busy < self.limit and not self._slot_waiters:
+            self._busy += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._slot_waiters.append(waiter)
+        try:
+            # _wake_slot_waiters() takes the slot on the waiter's behalf
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just as this caller went away; pass it on
+                self._busy -= 1
+                self._wake_slot_waiters()
+            raise
+        finally:
+            if waiter in self._slot_waiters:
+                self._slot_waiters.remove(waiter)
+
+    def _wake_slot_waiters(self):
+        """Hand free slots to waiting callers in arrival order, so later callers cannot take them first."""
+        while self._slot_waiters and self._busy < self.limit:
+            waiter = self._slot_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self._busy += 1
+
+    def _admit(self):
+        left = remaining()
+        if left is None:
+            return
+        wait = self.expected_wait()
+        retry_after = max(math.ceil(wait), 1)
+        if self.max_queue is not None and self._waiting >= self.max_queue:
+            self.counters["rejected_queue_full"] += 1
+            raise ScrapeRejected(f"{self._waiting} scrape jobs already queued", retry_after)
+        if wait > left:
+            self.counters["rejected_deadline"] += 1
+            raise ScrapeRejected(f"Expected queueing delay {wait:.1f}s exceeds the deadline", retry_after)
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on a worker thread; cancelling the caller cancels the job."""
+        loop = asyncio.get_running_loop()
+        cancel = threading.Event()
+        self._admit()
+
+        self._waiting += 1
+        try:
+            left = remaining()
+            if left is None:
+                await self._acquire_slot()
+            else:
+                try:
+                    await asyncio.wait_for(self._acquire_slot(), max(left, 0.0))
+                except asyncio.TimeoutError:
+                    raise DeadlineExceeded("Request deadline exceeded waiting for a scrape worker") from None
+        finally:
+            self._waiting -= 1
+
+        ctx = contextvars.copy_context()
+        ctx.run(_cancel_event.set, cancel)
+        self._running += 1
+        started = time.monotonic()
+        future = loop.run_in_executor(self._pool, ctx.run, fn, *args)
+        # The slot is only released once the worker thread has really finished
+        future.add_done_callback(lambda done: self._release(done, time.monotonic() - started))
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            logger.info(f"Cancelling scrape job {getattr(fn, '__name__', fn)}")
+            cancel.set()
+            raise
+
+    def _release(self, future, seconds):
+        self._running -= 1
+        self._busy -= 1
+        self._wake_slot_waiters()
+        self._job_seconds += 0.2 * (seconds - self._job_seconds)
+        # Consume the exception of abandoned jobs so it is not reported as unretrieved
+        if not future.cancelled():
+            future.exception()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+async def cancel_on_disconnect(request, coro):
+    """Await coro, cancelling it if the HTTP client disconnects or the deadline passes first."""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=clamp_timeout(settings.DISCONNECT_POLL_INTERVAL))
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                logger.info("Client disconnected, cancelling scrape")
+                task.cancel()
+                raise ScrapeCancelled("Client disconnected")
+            left = remaining()
+            if left is not None and left <= 0:
+                logger.info("Request deadline passed, cancelling scrape")
+                task.cancel()
+                raise DeadlineExceeded("Request deadline exceeded")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+scrape_executor = ScrapeExecutor(
+    max_workers=settings.SCRAPE_MAX_CONCURRENCY,
+    max_queue=settings.SCRAPE_MAX_QUEUE,
+)
@@ -1,21 +1,87 @@
 import undetected_chromedriver as uc
 import logging
+import shutil
+import time
+from selenium.common.exceptions import SessionNotCreatedException
 from app.core.config import settings
+from app.utils.browser_cache import browser_cache
+from app.utils.metrics import DRIVER_START_SECONDS, DRIVER_STARTS
+from app.utils.network import apply_resource_blocking, configure_options
 
 logger = logging.getLogger(__name__)
 
-def get_driver():
-    """Initialize and return an undetected-chromedriver which handles version issues better."""
-    try:
-        options = uc.ChromeOptions()
-        
-        # Add chrome options from settings
-        for arg in settings.CHROME_DRIVER_ARGS:
+TAB_CHROME_ARGS = [
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+]
+
+def build_options(proxy=None):
+    """Chrome options from settings; uc refuses to reuse an options object."""
+    options = uc.ChromeOptions()
+    
+    # Add chrome options from settings
+    for arg in settings.CHROME_DRIVER_ARGS:
+        options.add_argument(arg)
+    options.page_load_strategy = settings.PAGE_LOAD_STRATEGY
+    if settings.TABS_PER_BROWSER > 1:
+        # Tabs navigate without blocking the shared session and must keep
+        # running their timers while another tab is in front
+        options.page_load_strategy = "none"
+        for arg in TAB_CHROME_ARGS:
             options.add_argument(arg)
-        
+    if proxy is not None:
+        options.add_argument(f"--proxy-server={proxy.server}")
+    configure_options(options)
+    return options
+
+def _launch_cached(proxy):
+    """Start Chrome with the cached patched driver on a clone of the template profile."""
+    browser_cache.prepare(build_options)
+    profile = browser_cache.clone_profile()
+    try:
+        driver = uc.Chrome(
+            options=build_options(proxy), user_data_dir=profile,
+            driver_executable_path=browser_cache.driver_path,
+            version_main=settings.CHROME_VERSION_MAIN
+        )
+    except Exception:
+        shutil.rmtree(profile, ignore_errors=True)
+        raise
+    # The clone belongs to this browser alone; let uc delete it on quit
+    driver.keep_user_data_dir = False
+    return driver
+
+def _launch(proxy):
+    if not settings.BROWSER_CACHE_ENABLED:
         # Initialize undetected-chromedriver which handles version compatibility better
-        driver = uc.Chrome(options=options)
+        return uc.Chrome(options=build_options(proxy))
+    try:
+        return _launch_cached(proxy)
+    except SessionNotCreatedException as e:
+        # Chrome was probably upgraded past the cached driver; patch a fresh one
+        logger.warning(f"Cached chromedriver rejected, re-patching: {e.msg}")
+        browser_cache.invalidate_driver()
+        return _launch_cached(proxy)
+
+def get_driver(proxy=None):
+    """Initialize and return an undetected-chromedriver which handles version issues better.
+
+    With a proxy from the proxy pool all of the browser's traffic goes through it;
+    the driver keeps it as `driver.proxy` so outcomes can be credited to it.
+    """
+    started = time.perf_counter()
+    try:
+        driver = _launch(proxy)
+        driver.proxy = proxy
+        try:
+            apply_resource_blocking(driver)
+        except Exception as e:
+            logger.warning(f"Could not enable resource blocking: {e}")
+        DRIVER_STARTS.inc(result="ok")
+        DRIVER_START_SECONDS.observe(time.perf_counter() - started)
         return driver
     except Exception as e:
+        DRIVER_STARTS.inc(result="error")
         logger.error(f"Failed to initialize Chrome driver: {e}")
         raise Exception(f"Chrome driver initialization failed: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,297 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from app.core.config import settings
+from app.utils.driver import get_driver
+from app.utils.captcha_solver import is_captcha_page
+from app.utils.concurrency import check_cancelled, clamp_timeout
+from app.utils.proxies import proxy_pool
+from app.utils.sessions import session_store
+from app.utils.tabs import TabbedBrowsers
+
+logger = logging.getLogger(__name__)
+
+def launch_browser():
+    """Start Chrome behind a proxy from the proxy pool, if any are configured."""
+    return get_driver(proxy=proxy_pool.select())
+
+tabbed_browsers = TabbedBrowsers(
+    launch=launch_browser,
+    tabs_per_browser=settings.TABS_PER_BROWSER,
+    max_age_seconds=settings.DRIVER_POOL_MAX_AGE_MINUTES * 60,
+    proxy_pool=proxy_pool,
+)
+
+def create_session_driver():
+    """Start a driver preloaded with the best stored captcha-cleared session."""
+    driver = tabbed_browsers.open() if settings.TABS_PER_BROWSER > 1 else launch_browser()
+    # A new tab joins its browser's cookie jar and the session already in it
+    if settings.SESSION_STORE_ENABLED and not session_store.is_bound(driver):
+        session_store.apply(driver)
+    return driver
+
+class DriverPoolClosed(Exception):
+    """Raised when a driver is requested from a pool that is draining."""
+
+class DriverPoolTimeout(Exception):
+    """Raised when no driver becomes available within the checkout timeout."""
+
+class PooledDriver:
+    """A driver instance together with the bookkeeping needed for recycling."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.uses = 0
+        self.retired = False
+
+    @property
+    def age(self):
+        return time.monotonic() - self.created_at
+
+class DriverPool:
+    """Thread-safe pool of warm Chrome drivers with checkout/checkin semantics."""
+
+    def __init__(self, min_size, max_size, max_uses, max_age_seconds,
+                 checkout_timeout, drain_timeout, factory=get_driver):
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.max_age_seconds = max_age_seconds
+        self.checkout_timeout = checkout_timeout
+        self.drain_timeout = drain_timeout
+        self._factory = factory
+        self._idle = []
+        self._in_use = {}
+        self._pending = 0
+        self._closed = False
+        self.started = False
+        self._cond = threading.Condition()
+
+    @property
+    def size(self):
+        with self._cond:
+            return len(self._idle) + len(self._in_use) + self._pending
+
+    def stats(self):
+        """Return a snapshot of the pool occupancy."""
+        with self._cond:
+            return {
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "starting": self._pending,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "started": self.started,
+            }
+
+    def start(self):
+        """Pre-launch drivers until the pool holds at least min_size of them."""
+        with self._cond:
+            self._closed = False
+            missing = max(self.min_size - (len(self._idle) + len(self._in_use) + self._pending), 0)
+            self._pending += missing
+        # Launch in parallel; a cold start is mostly spent waiting on Chrome
+        threads = [
+            threading.Thread(target=self._start_one, name=f"driver-warmup-{index}", daemon=True)
+            for index in range(missing)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with self._cond:
+            self.started = True
+        logger.info(f"Driver pool started with {self.size} warm driver(s)")
+
+    def _start_one(self):
+        entry = self._create()
+        with self._cond:
+            self._pending -= 1
+            if entry is not None and not self._closed:
+                self._idle.append(entry)
+                entry = None
+            self._cond.notify()
+        if entry is not None:
+            # The pool was drained while this driver was starting
+            self._close(entry)
+
+    def checkout(self):
+        """Borrow a healthy driver, launching a new one if the pool has room."""
+        # Waiting past the request deadline is pointless
+        deadline = time.monotonic() + clamp_timeout(self.checkout_timeout)
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise DriverPoolClosed("Driver pool is shutting down")
+
+                while self._idle:
+                    entry = self._idle.pop()
+                    # Count the driver as pending while it is checked outside the lock
+                    self._pending += 1
+                    self._cond.release()
+                    try:
+                        healthy = self._is_healthy(entry)
+                        if not healthy:
+                            self._close(entry)
+                    finally:
+                        self._cond.acquire()
+                        self._pending -= 1
+                    if healthy:
+                        if settings.SESSION_STORE_ENABLED and not session_store.is_bound(entry.driver):
+                            # Its session was retired; hand it the best remaining one
+                            session_store.apply(entry.driver)
+                        entry.uses += 1
+                        self._in_use[id(entry.driver)] = entry
+                        return entry.driver
+
+                if len(self._in_use) + self._pending < self.max_size:
+                    self._pending += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    check_cancelled()
+                    raise DriverPoolTimeout(
+                        f"No driver available after {self.checkout_timeout}s"
+                    )
+                self._cond.wait(remaining)
+
+        entry = None
+        try:
+            entry = self._create(raise_errors=True)
+        finally:
+            with self._cond:
+                self._pending -= 1
+                if entry is not None:
+                    entry.uses += 1
+                    self._in_use[id(entry.driver)] = entry
+                self._cond.notify()
+        return entry.driver
+
+    def entries(self):
+        """Snapshot of the pooled drivers as (entry, in_use) pairs."""
+        with self._cond:
+            return [(entry, False) for entry in self._idle] + [(entry, True) for entry in self._in_use.values()]
+
+    def retire(self, entry):
+        """Close an idle driver now, or a borrowed one as soon as it is checked in."""
+        with self._cond:
+            entry.retired = True
+            if entry not in self._idle:
+                return
+            self._idle.remove(entry)
+            self._cond.notify()
+        self._close(entry)
+
+    def checkin(self, driver, discard=False):
+        """Return a borrowed driver to the pool, or close it if it should be retired."""
+        with self._cond:
+            entry = self._in_use.pop(id(driver), None)
+            if entry is None:
+                logger.warning("Checked in a driver that does not belong to the pool")
+                return
+            retire = discard or self._closed or self._is_expired(entry)
+            if not retire:
+                self._idle.append(entry)
+            self._cond.notify_all()
+
+        if retire:
+            self._close(entry)
+
+    @contextmanager
+    def driver(self, driver=None):
+        """Context manager that checks a driver out (unless one is given) and always checks it back in."""
+        if driver is None:
+            driver = self.checkout()
+        discard = False
+        try:
+            yield driver
+        except BaseException:
+            discard = not self._session_alive(driver)
+            raise
+        finally:
+            self.checkin(driver, discard=discard)
+
+    def drain(self):
+        """Stop handing out drivers, wait for borrowed ones, then quit all of them."""
+        with self._cond:
+            self._closed = True
+            deadline = time.monotonic() + self.drain_timeout
+            while self._in_use or self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"Drain timed out with {len(self._in_use)} driver(s) still in use")
+                    break
+                self._cond.wait(remaining)
+            entries = self._idle + list(self._in_use.values())
+            self._idle = []
+            self._in_use = {}
+            self._cond.notify_all()
+
+        for entry in entries:
+            self._close(entry)
+        session_store.flush()
+        logger.info(f"Driver pool drained, closed {len(entries)} driver(s)")
+
+    def _create(self, raise_errors=False):
+        try:
+            return PooledDriver(self._factory())
+        except Exception as e:
+            logger.error(f"Failed to start pooled driver: {e}")
+            if raise_errors:
+                raise
+            return None
+
+    def _is_expired(self, entry):
+        if entry.retired:
+            return True
+        if self.max_uses and entry.uses >= self.max_uses:
+            return True
+        if self.max_age_seconds and entry.age >= self.max_age_seconds:
+            return True
+        # A browser cannot change proxies, so one behind a quarantined proxy is replaced
+        # once there is a healthy proxy for its successor
+        proxy = getattr(entry.driver, "proxy", None)
+        if proxy is not None and proxy.quarantined and proxy_pool.has_healthy():
+            return True
+        return False
+
+    def _session_alive(self, driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _is_healthy(self, entry):
+        """Decide whether an idle driver can be reused for the next request."""
+        if self._is_expired(entry):
+            logger.info(f"Recycling driver after {entry.uses} uses / {entry.age:.0f}s")
+            return False
+        if not self._session_alive(entry.driver):
+            logger.warning("Discarding pooled driver with a dead session")
+            return False
+        if is_captcha_page(entry.driver):
+            logger.warning("Discarding pooled driver stuck on a captcha page")
+            return False
+        return True
+
+    def _close(self, entry):
+        try:
+            entry.driver.quit()
+        except Exception as e:
+            logger.error(f"Error closing driver: {e}")
+        session_store.release(entry.driver)
+
+driver_pool = DriverPool(
+    min_size=settings.DRIVER_POOL_MIN_SIZE,
+    max_size=settings.DRIVER_POOL_MAX_SIZE,
+    max_uses=settings.DRIVER_POOL_MAX_USES,
+    max_age_seconds=settings.DRIVER_POOL_MAX_AGE_MINUTES * 60,
+    checkout_timeout=settings.DRIVER_POOL_CHECKOUT_TIMEOUT,
+    drain_timeout=settings.DRIVER_POOL_DRAIN_TIMEOUT,
+    factory=create_session_driver,
+)
@@ -0,0 +1,77 @@
+import gzip
+import json
+import logging
+
+from starlette.responses import Response
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+def dumps(value) -> bytes:
+    """Encode a value as compact UTF-8 JSON, with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        except (TypeError, orjson.JSONEncodeError):
+            # Integers beyond 64 bits and the like; the stdlib encoder copes
+            pass
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def splice_object(members) -> bytes:
+    """Build a JSON object from (key, already-encoded value bytes) pairs without re-encoding."""
+    return b"{" + b",".join(dumps(key) + b":" + encoded for key, encoded in members) + b"}"
+
+def _accepted_encodings(accept_encoding):
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+def choose_encoding(accept_encoding) -> str:
+    """Pick br, gzip or identity from an Accept-Encoding header."""
+    accepted = _accepted_encodings(accept_encoding or "")
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best = max(candidates, key=lambda name: accepted.get(name, accepted.get("*", 0.0)))
+    return best if accepted.get(best, accepted.get("*", 0.0)) > 0 else "identity"
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=settings.RESPONSE_GZIP_LEVEL)
+    return body
+
+def json_bytes_response(body: bytes, request, status_code=200) -> Response:
+    """Response carrying pre-encoded JSON, compressed as the client accepts."""
+    headers = {"Vary": "Accept-Encoding"}
+    if settings.RESPONSE_COMPRESSION_ENABLED and len(body) >= settings.RESPONSE_COMPRESSION_MIN_SIZE:
+        encoding = choose_encoding(request.headers.get("accept-encoding"))
+        if encoding != "identity":
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+    return Response(body, status_code=status_code, headers=headers, media_type="application/json")
@@ -0,0 +1,117 @@
+import html
+import json
+import logging
+import re
+
+from selenium.common.exceptions import WebDriverException
+
+logger = logging.getLogger(__name__)
+
+# Inline script globals holding the product payload, keyed by result field
+PAYLOAD_GLOBALS = {
+    "global_data": "window.__GLOBAL_DADA",
+    "init_data": "window.__INIT_DATA",
+}
+
+# Title, payload globals and optionally the serialized DOM in a single script call.
+# The result comes back as one JSON string: Selenium unwraps returned objects value
+# by value in Python, which is much slower than one json.loads of the same data.
+PAGE_SNAPSHOT_SCRIPT = """
+var snapshot = {title: document.title, payload: {}};
+%s
+if (arguments[0]) {
+    snapshot.source = document.documentElement.outerHTML;
+}
+try {
+    return JSON.stringify(snapshot);
+} catch (e) {
+    // A payload the page turned into something JSON cannot hold
+    snapshot.payload = null;
+    snapshot.error = String(e);
+    return JSON.stringify(snapshot);
+}
+""" % "\n".join(
+    f"snapshot.payload.{field} = typeof {name} === 'undefined' ? null : {name};"
+    for field, name in PAYLOAD_GLOBALS.items()
+)
+
+_decoder = json.JSONDecoder()
+_title_pattern = re.compile(r"<title[^>]*>([^<]*)</title>", re.IGNORECASE)
+
+def extract_assignment(html_content, name, start=0):
+    """Parse the JSON value assigned to a global such as `window.__GLOBAL_DADA`.
+
+    The assignment is located with plain substring search and the value is read
+    with the C JSON scanner, which stops at the end of the balanced object; the
+    page is scanned once and nothing backtracks.
+    """
+    index = html_content.find(name, start)
+    while index != -1:
+        position = index + len(name)
+        # Skip whitespace up to the '=' of the assignment
+        while position < len(html_content) and html_content[position].isspace():
+            position += 1
+        if html_content.startswith("=", position) and not html_content.startswith("==", position):
+            position += 1
+            while position < len(html_content) and html_content[position].isspace():
+                position += 1
+            try:
+                value, _ = _decoder.raw_decode(html_content, position)
+                return value
+            except json.JSONDecodeError as e:
+                logger.warning(f"Could not parse {name} payload: {e}")
+                return None
+        # A read or comparison of the global rather than an assignment; keep looking
+        index = html_content.find(name, position)
+    return None
+
+def extract_json_data(html_content):
+    """Extract the product payload globals from the page as parsed JSON.
+
+    Returns a dict with `global_data` and `init_data` (either may be None), or
+    None when neither global is present.
+    """
+    logger.info("Looking for product data.")
+    result = {
+        field: extract_assignment(html_content, name)
+        for field, name in PAYLOAD_GLOBALS.items()
+    }
+    if all(value is None for value in result.values()):
+        logger.warning("No window.__GLOBAL_DADA found in the page source")
+        return None
+    return result
+
+def snapshot_page(driver, include_source=False):
+    """Read the page title and product payload with one round trip to the browser.
+
+    Returns a dict with `title`, `data` (as from extract_json_data) and `source`,
+    the page HTML, which is only fetched when include_source is set or the payload
+    could not be read from the live page and has to be parsed out of the HTML.
+    """
+    try:
+        result = driver.execute_script(PAGE_SNAPSHOT_SCRIPT, include_source)
+        snapshot = json.loads(result) if isinstance(result, str) else None
+    except (WebDriverException, ValueError) as e:
+        logger.warning(f"Page snapshot script failed: {e}")
+        snapshot = None
+    if snapshot is None:
+        # The document may have been swapped while the script ran; parse the HTML instead
+        source = driver.page_source
+        return {"title": extract_title(source), "data": extract_json_data(source), "source": source}
+    payload = snapshot.get("payload")
+    source = snapshot.get("source")
+    if payload is None:
+        logger.warning(f"Could not serialize the payload in the page: {snapshot.get('error')}")
+    elif any(value is not None for value in payload.values()):
+        return {"title": snapshot.get("title"), "data": payload, "source": source}
+    # Pages may delete or mangle the globals after reading them; the HTML still has the originals
+    if source is None:
+        source = driver.page_source
+    return {"title": snapshot.get("title"), "data": extract_json_data(source), "source": source}
+
+def extract_title(html_content):
+    """Return the text of the page <title>, or None if it has none."""
+    match = _title_pattern.search(html_content)
+    if match is None:
+        return None
+    return html.unescape(match.group(1)).strip()
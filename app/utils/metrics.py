@@ -0,0 +1,170 @@
+import bisect
+import threading
+
+# Latency buckets in seconds, from fast HTTP fetches to multi-retry captcha runs
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def _samples(self):
+        with self._lock:
+            snapshot = {
+                key: {"counts": list(series["counts"]), "sum": series["sum"], "count": series["count"]}
+                for key, series in self._series.items()
+            }
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, series["counts"]):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(float(bound))))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key, ("le", "+Inf"))
+            yield f"{self.name}_bucket{labels} {series['count']}"
+            plain = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{plain} {_format_value(series['sum'])}"
+            yield f"{self.name}_count{plain} {series['count']}"
+
+class CallbackMetric(_Metric):
+    """Gauge or counter whose samples are read from a callback at scrape time.
+
+    The callback returns a number, or a dict mapping label-value tuples to numbers.
+    """
+
+    def __init__(self, name, documentation, callback, labelnames=(), kind="gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self._callback = callback
+
+    def _samples(self):
+        value = self._callback()
+        if value is None:
+            return
+        if not isinstance(value, dict):
+            value = {(): value}
+        for key, sample in sorted(value.items()):
+            if sample is None:
+                continue
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(sample)}"
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+registry = Registry()
+
+def counter(name, documentation, labelnames=()):
+    return registry.register(Counter(name, documentation, labelnames))
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+def gauge_callback(name, documentation, callback, labelnames=()):
+    return registry.register(CallbackMetric(name, documentation, callback, labelnames, "gauge"))
+
+def counter_callback(name, documentation, callback, labelnames=()):
+    return registry.register(CallbackMetric(name, documentation, callback, labelnames, "counter"))
+
+# Scrape pipeline metrics recorded at the point where the work happens
+STAGE_SECONDS = histogram(
+    "scraper_stage_seconds", "Time spent in each scrape stage", ("stage",)
+)
+VARIANT_SECONDS = histogram(
+    "scraper_variant_seconds", "End-to-end time to fetch one product variant", ("variant", "result")
+)
+VARIANT_RESULTS = counter(
+    "scraper_variant_results_total", "Variant fetches by how they finished", ("variant", "result")
+)
+DRIVER_START_SECONDS = histogram(
+    "scraper_driver_start_seconds", "Time to launch a Chrome driver"
+)
+DRIVER_STARTS = counter(
+    "scraper_driver_starts_total", "Chrome driver launches", ("result",)
+)
+RETRIES = counter(
+    "scraper_retries_total", "Retry attempts made by the tenacity retry loops", ("operation",)
+)
+CAPTCHA_OUTCOMES = counter(
+    "scraper_captcha_outcomes_total", "Captcha encounters and slider solve verdicts", ("outcome",)
+)
+PAGE_BYTES = counter(
+    "scraper_page_bytes_total", "Bytes received while loading product pages", ("path",)
+)
@@ -0,0 +1,83 @@
+import json
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# URL patterns (DevTools Network.setBlockedURLs syntax) for each blockable resource type
+RESOURCE_TYPE_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*", "*.avif*"],
+    "font": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*.flv*"],
+    "stylesheet": ["*.css*"],
+}
+
+def blocked_url_patterns():
+    """URL patterns to block according to the resource-blocking settings."""
+    patterns = []
+    for resource_type in settings.BLOCKED_RESOURCE_TYPES:
+        if resource_type not in RESOURCE_TYPE_PATTERNS:
+            logger.warning(f"Unknown blocked resource type: {resource_type}")
+            continue
+        patterns.extend(RESOURCE_TYPE_PATTERNS[resource_type])
+    patterns.extend(settings.BLOCKED_URL_PATTERNS)
+    return patterns
+
+def configure_options(options):
+    """Add the Chrome preferences and capabilities needed for blocking and byte counting."""
+    if settings.BLOCK_RESOURCES_ENABLED and "image" in settings.BLOCKED_RESOURCE_TYPES:
+        # Also stop image decoding at the renderer level, not only the download
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    if settings.TRACK_PAGE_BYTES:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+def apply_resource_blocking(driver):
+    """Block the configured URL patterns for every page this driver loads."""
+    if not settings.BLOCK_RESOURCES_ENABLED:
+        return
+    patterns = blocked_url_patterns()
+    if not patterns:
+        return
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    logger.info(f"Blocking {len(patterns)} URL pattern(s) in the browser")
+
+def _tracks_bytes(driver):
+    # The performance log belongs to the whole browser, so tabs cannot tell their bytes apart
+    return settings.TRACK_PAGE_BYTES and not getattr(driver, "shares_browser", False)
+
+def reset_network_log(driver):
+    """Discard buffered network events so the next read covers one page only."""
+    if _tracks_bytes(driver):
+        try:
+            driver.get_log("performance")
+        except Exception as e:
+            logger.debug(f"Could not reset performance log: {e}")
+
+def read_network_usage(driver):
+    """Sum the bytes received and requests blocked since the last read.
+
+    Returns None when byte tracking is disabled or the log is unavailable.
+    """
+    if not _tracks_bytes(driver):
+        return None
+    try:
+        entries = driver.get_log("performance")
+    except Exception as e:
+        logger.debug(f"Could not read performance log: {e}")
+        return None
+
+    usage = {"bytes": 0, "requests": 0, "blocked": 0}
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method = message.get("method")
+        if method == "Network.loadingFinished":
+            usage["bytes"] += int(message["params"].get("encodedDataLength", 0))
+            usage["requests"] += 1
+        elif method == "Network.loadingFailed" and message["params"].get("blockedReason"):
+            usage["blocked"] += 1
+    return usage
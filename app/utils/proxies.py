@@ -0,0 +1,215 @@
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from app.core.config import settings
+from app.utils.rate_limiter import OUTCOME_CAPTCHA, OUTCOME_FAILED, OUTCOME_OK, new_rate_limiter, rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Floor on selection weights so a proxy that only ever failed can still be picked once healthy
+_MIN_WEIGHT = 1e-3
+
+class Proxy:
+    """An upstream proxy with rolling health statistics and its own rate limiter."""
+
+    def __init__(self, url, alpha):
+        self.url = url
+        self.alpha = alpha
+        parts = urlsplit(url)
+        # Chrome takes no credentials in --proxy-server, and they do not belong in logs
+        self.server = f"{parts.scheme}://{parts.hostname}:{parts.port}" if parts.port else f"{parts.scheme}://{parts.hostname}"
+        self.latency = None
+        self.captcha_rate = 0.0
+        self.failure_rate = 0.0
+        self.samples = 0
+        self.consecutive_failures = 0
+        self.quarantined_until = None
+        self.quarantine_level = 0
+        self.probing = False
+        self.rate_limiter = new_rate_limiter()
+
+    @property
+    def quarantined(self):
+        return self.quarantined_until is not None
+
+    @property
+    def requests_proxies(self):
+        return {"http": self.url, "https": self.url}
+
+    def score(self, default_latency):
+        """Clean pages per second of latency; higher is better."""
+        latency = self.latency if self.latency is not None else default_latency
+        return (1 - self.captcha_rate) * (1 - self.failure_rate) / max(latency, 0.01)
+
+    def record(self, outcome, latency=None):
+        self.samples += 1
+        self.captcha_rate += self.alpha * ((outcome == OUTCOME_CAPTCHA) - self.captcha_rate)
+        self.failure_rate += self.alpha * ((outcome == OUTCOME_FAILED) - self.failure_rate)
+        if outcome == OUTCOME_OK:
+            self.consecutive_failures = 0
+            if latency is not None:
+                self.latency = latency if self.latency is None else self.latency + self.alpha * (latency - self.latency)
+        elif outcome == OUTCOME_FAILED:
+            self.consecutive_failures += 1
+        # Captchas mean throttling rather than a broken proxy; they only weigh in through captcha_rate
+
+    def reset(self):
+        """Start over with neutral statistics after passing a probe."""
+        self.captcha_rate = 0.0
+        self.failure_rate = 0.0
+        self.samples = 0
+        self.consecutive_failures = 0
+        self.quarantined_until = None
+
+    def stats(self):
+        return {
+            "proxy": self.server,
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "captcha_rate": round(self.captcha_rate, 4),
+            "failure_rate": round(self.failure_rate, 4),
+            "samples": self.samples,
+            "quarantined_for": round(max(self.quarantined_until - time.monotonic(), 0), 1) if self.quarantined else None,
+        }
+
+class ProxyPool:
+    """Proxies handed to browsers and the HTTP fast path, weighted toward healthy, fast ones.
+
+    Every page fetched through a proxy updates its rolling latency, captcha rate and
+    failure rate. Selection is random with weights from those scores, so load spreads
+    over the pool while slow or challenged proxies get less of it. A proxy that keeps
+    failing is quarantined; once the quarantine ends it is probed in the background and
+    either rejoins with fresh statistics or stays out for twice as long.
+    """
+
+    def __init__(self, urls, alpha, max_consecutive_failures, bad_rate, min_samples,
+                 quarantine_seconds, max_quarantine_seconds, probe_url, probe_timeout):
+        self.proxies = [Proxy(url, alpha) for url in urls]
+        self.max_consecutive_failures = max_consecutive_failures
+        self.bad_rate = bad_rate
+        self.min_samples = min_samples
+        self.quarantine_seconds = quarantine_seconds
+        self.max_quarantine_seconds = max_quarantine_seconds
+        self.probe_url = probe_url
+        self.probe_timeout = probe_timeout
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self.counters = {"selected": 0, "quarantined": 0, "probes": 0, "probe_failures": 0}
+
+    def select(self):
+        """Pick a proxy for a new driver or request; None when no proxies are configured."""
+        if not self.proxies:
+            return None
+        with self._lock:
+            self._start_due_probes()
+            healthy = [proxy for proxy in self.proxies if not proxy.quarantined]
+            self.counters["selected"] += 1
+            if not healthy:
+                # Everything is quarantined; the proxy closest to its probe beats going direct.
+                # Pooled browsers behind quarantined proxies are kept meanwhile, see has_healthy().
+                return min(self.proxies, key=lambda proxy: proxy.quarantined_until)
+            # Proxies without measurements yet are assumed to be as fast as the average
+            measured = [proxy.latency for proxy in healthy if proxy.latency is not None]
+            default_latency = sum(measured) / len(measured) if measured else 1.0
+            weights = [max(proxy.score(default_latency), _MIN_WEIGHT) for proxy in healthy]
+            return self._random.choices(healthy, weights)[0]
+
+    def has_healthy(self):
+        """Whether any proxy is out of quarantine; also starts the probes that are due.
+
+        Replacing a browser behind a quarantined proxy only helps when a healthy one
+        can take its place; otherwise every scrape would pay for a cold start.
+        """
+        with self._lock:
+            self._start_due_probes()
+            return any(not proxy.quarantined for proxy in self.proxies)
+
+    def record(self, proxy, outcome, latency=None):
+        """Feed back the outcome of a fetch through a proxy, one of the OUTCOME_* constants."""
+        if proxy is None:
+            return
+        proxy.rate_limiter.record(outcome)
+        with self._lock:
+            proxy.record(outcome, latency)
+            if proxy.quarantined or not self._is_unfit(proxy):
+                return
+            self._quarantine(proxy)
+        logger.warning(
+            f"Quarantined proxy {proxy.server} after {proxy.consecutive_failures} consecutive failure(s), "
+            f"captcha rate {proxy.captcha_rate:.2f}, failure rate {proxy.failure_rate:.2f}"
+        )
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self.counters,
+                "healthy": sum(1 for proxy in self.proxies if not proxy.quarantined),
+                "quarantined": sum(1 for proxy in self.proxies if proxy.quarantined),
+                "proxies": [proxy.stats() for proxy in self.proxies],
+            }
+
+    def _is_unfit(self, proxy):
+        if proxy.consecutive_failures >= self.max_consecutive_failures:
+            return True
+        return proxy.samples >= self.min_samples and proxy.captcha_rate + proxy.failure_rate >= self.bad_rate
+
+    def _quarantine(self, proxy):
+        duration = min(self.quarantine_seconds * 2 ** proxy.quarantine_level, self.max_quarantine_seconds)
+        proxy.quarantined_until = time.monotonic() + duration
+        proxy.quarantine_level += 1
+        self.counters["quarantined"] += 1
+
+    def _start_due_probes(self):
+        now = time.monotonic()
+        for proxy in self.proxies:
+            if proxy.quarantined and not proxy.probing and proxy.quarantined_until <= now:
+                proxy.probing = True
+                threading.Thread(target=self._probe, args=(proxy,), name="proxy-probe", daemon=True).start()
+
+    def _probe(self, proxy):
+        """Check a proxy whose quarantine has run out; any HTTP response below 500 passes."""
+        started = time.perf_counter()
+        try:
+            response = requests.get(self.probe_url, proxies=proxy.requests_proxies, timeout=self.probe_timeout)
+            passed = response.status_code < 500
+        except requests.RequestException as e:
+            logger.info(f"Probe of proxy {proxy.server} failed: {e}")
+            passed = False
+        with self._lock:
+            proxy.probing = False
+            self.counters["probes"] += 1
+            if passed:
+                proxy.reset()
+                proxy.quarantine_level = 0
+                proxy.latency = time.perf_counter() - started
+            else:
+                self.counters["probe_failures"] += 1
+                self._quarantine(proxy)
+        logger.info(f"Proxy {proxy.server} {'rejoined the pool' if passed else 'stays quarantined'} after probe")
+
+def limiter_for(proxy):
+    """Rate limiter for traffic through a proxy, or the direct one when there is none."""
+    return proxy.rate_limiter if proxy is not None else rate_limiter
+
+def record_outcome(proxy, outcome, latency=None):
+    """Feed a page outcome to the rate limiter and health score of the route it took."""
+    if proxy is None:
+        rate_limiter.record(outcome)
+    else:
+        proxy_pool.record(proxy, outcome, latency)
+
+proxy_pool = ProxyPool(
+    urls=settings.PROXY_URLS,
+    alpha=settings.PROXY_SCORE_ALPHA,
+    max_consecutive_failures=settings.PROXY_MAX_CONSECUTIVE_FAILURES,
+    bad_rate=settings.PROXY_QUARANTINE_BAD_RATE,
+    min_samples=settings.PROXY_MIN_SAMPLES,
+    quarantine_seconds=settings.PROXY_QUARANTINE_SECONDS,
+    max_quarantine_seconds=settings.PROXY_QUARANTINE_MAX_SECONDS,
+    probe_url=settings.PROXY_PROBE_URL,
+    probe_timeout=settings.PROXY_PROBE_TIMEOUT,
+)
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from app.core.config import settings
+from app.utils.concurrency import sleep
+
+logger = logging.getLogger(__name__)
+
+OUTCOME_OK = "ok"
+OUTCOME_CAPTCHA = "captcha"
+OUTCOME_FAILED = "failed"
+
+class AdaptiveRateLimiter:
+    """Process-wide token bucket whose rate adapts AIMD-style to page outcomes.
+
+    Every clean page adds `increase_step` requests/second to the rate. When the
+    share of captchas or failed extractions over the last `window` pages climbs
+    past `threshold`, the rate is multiplied by `decrease_factor`, at most once
+    per `cooldown` seconds so one burst of captchas does not collapse it.
+    """
+
+    def __init__(self, initial_rate, min_rate, max_rate, increase_step, decrease_factor,
+                 window, threshold, cooldown, burst):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.burst = burst
+        self.rate = min(max(initial_rate, min_rate), max_rate)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._last_decrease = 0.0
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.counters = {"acquired": 0, "waited_seconds": 0.0, "decreases": 0}
+
+    def acquire(self):
+        """Block the calling worker thread until the next request may be sent."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Reserve a token; a negative balance is the queue of waiting requests
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.counters["acquired"] += 1
+            self.counters["waited_seconds"] += wait
+        if wait > 0:
+            try:
+                sleep(wait)
+            except BaseException:
+                # Cancelled or out of deadline before sending; the reserved token is still unused
+                with self._lock:
+                    self._tokens += 1
+                    self.counters["acquired"] -= 1
+                    self.counters["waited_seconds"] -= wait
+                raise
+
+    def record(self, outcome):
+        """Feed back the outcome of a page fetch, one of the OUTCOME_* constants."""
+        with self._lock:
+            self._outcomes.append(outcome)
+            if outcome == OUTCOME_OK:
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+                return
+
+            now = time.monotonic()
+            if self._bad_ratio() < self.threshold or now - self._last_decrease < self.cooldown:
+                return
+            previous = self.rate
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._last_decrease = now
+            self.counters["decreases"] += 1
+        logger.warning(f"Backing off request rate {previous:.2f} -> {self.rate:.2f}/s after {outcome}")
+
+    def _ratio(self, outcome):
+        if not self._outcomes:
+            return 0.0
+        return sum(1 for seen in self._outcomes if seen == outcome) / len(self._outcomes)
+
+    def _bad_ratio(self):
+        return self._ratio(OUTCOME_CAPTCHA) + self._ratio(OUTCOME_FAILED)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rate": round(self.rate, 3),
+                "captcha_ratio": round(self._ratio(OUTCOME_CAPTCHA), 4),
+                "failure_ratio": round(self._ratio(OUTCOME_FAILED), 4),
+                "window": len(self._outcomes),
+                "acquired": self.counters["acquired"],
+                "waited_seconds": round(self.counters["waited_seconds"], 3),
+                "decreases": self.counters["decreases"],
+            }
+
+class _Unlimited:
+    """Stand-in used when rate limiting is disabled."""
+
+    def acquire(self):
+        pass
+
+    def record(self, outcome):
+        pass
+
+    def stats(self):
+        return {"enabled": False}
+
+def new_rate_limiter():
+    """Rate limiter configured from settings; each proxy gets its own since limits are per IP."""
+    if not settings.RATE_LIMIT_ENABLED:
+        return _Unlimited()
+    return AdaptiveRateLimiter(
+        initial_rate=settings.RATE_LIMIT_INITIAL_RPS,
+        min_rate=settings.RATE_LIMIT_MIN_RPS,
+        max_rate=settings.RATE_LIMIT_MAX_RPS,
+        increase_step=settings.RATE_LIMIT_INCREASE_STEP,
+        decrease_factor=settings.RATE_LIMIT_DECREASE_FACTOR,
+        window=settings.RATE_LIMIT_WINDOW,
+        threshold=settings.RATE_LIMIT_CAPTCHA_THRESHOLD,
+        cooldown=settings.RATE_LIMIT_COOLDOWN_SECONDS,
+        burst=settings.RATE_LIMIT_BURST,
+    )
+
+# Traffic that leaves directly from this host
+rate_limiter = new_rate_limiter()
@@ -0,0 +1,66 @@
+import logging
+import time
+
+from app.core.config import settings
+from app.utils.concurrency import check_cancelled, sleep
+
+logger = logging.getLogger(__name__)
+
+# Classify the current document in a single round trip
+PAGE_STATE_SCRIPT = """
+if (typeof window.__GLOBAL_DADA !== 'undefined' || typeof window.__INIT_DATA !== 'undefined') {
+    return 'data';
+}
+if (document.title.indexOf('Captcha Interception') !== -1 || document.getElementById('nc_1_n1z')) {
+    return 'captcha';
+}
+return document.readyState === 'complete' ? 'complete' : null;
+"""
+
+# Outcome of the slider once it has been released
+CAPTCHA_VERDICT_SCRIPT = """
+if (document.title.indexOf('Captcha Interception') === -1) {
+    return 'passed';
+}
+if (document.querySelector('#nc_1_n1z.btn_ok')) {
+    return 'passed';
+}
+if (document.querySelector('.errloading, .nc_iconfont.icon_warn')) {
+    return 'failed';
+}
+return null;
+"""
+
+def _poll(driver, script, timeout, poll_interval):
+    """Evaluate script until it returns a truthy value or the timeout expires."""
+    deadline = time.monotonic() + timeout
+    while True:
+        check_cancelled()
+        try:
+            state = driver.execute_script(script)
+        except Exception as e:
+            # The document may be replaced mid-navigation; try again
+            logger.debug(f"Readiness probe failed: {e}")
+            state = None
+        if state:
+            return state
+        if time.monotonic() >= deadline:
+            return None
+        sleep(poll_interval)
+
+def wait_for_page_ready(driver, timeout=None):
+    """Wait until the product payload or the captcha page is present.
+
+    Returns 'data', 'captcha', 'complete' (loaded without either), or 'timeout'.
+    """
+    timeout = settings.PAGE_READY_TIMEOUT if timeout is None else timeout
+    state = _poll(driver, PAGE_STATE_SCRIPT, timeout, settings.PAGE_READY_POLL_INTERVAL)
+    if state is None:
+        logger.warning(f"Page not ready after {timeout}s")
+        return "timeout"
+    return state
+
+def wait_for_captcha_verdict(driver, timeout=None):
+    """Wait for the slider to be accepted or rejected; returns 'passed', 'failed' or None."""
+    timeout = settings.CAPTCHA_VERIFY_TIMEOUT if timeout is None else timeout
+    return _poll(driver, CAPTCHA_VERDICT_SCRIPT, timeout, settings.PAGE_READY_POLL_INTERVAL)
@@ -0,0 +1,249 @@
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from app.core.config import settings
+from app.utils.tabs import TabDriver
+
+logger = logging.getLogger(__name__)
+
+class BrowserSession:
+    """Cookie jar of a browser that passed the captcha, with its track record."""
+
+    def __init__(self, cookies, user_agent=None, session_id=None, created_at=None,
+                 uses=0, successes=0, challenges=0, consecutive_challenges=0):
+        self.id = session_id or uuid.uuid4().hex
+        self.cookies = cookies
+        self.user_agent = user_agent
+        self.created_at = created_at or time.time()
+        self.uses = uses
+        self.successes = successes
+        self.challenges = challenges
+        self.consecutive_challenges = consecutive_challenges
+        # Not saved; when the session was last written and whether it changed since
+        self.persisted_at = None
+        self.dirty = False
+
+    @property
+    def age(self):
+        return time.time() - self.created_at
+
+    @property
+    def success_rate(self):
+        return self.successes / self.uses if self.uses else 1.0
+
+    def to_dict(self):
+        return {
+            "session_id": self.id,
+            "cookies": self.cookies,
+            "user_agent": self.user_agent,
+            "created_at": self.created_at,
+            "uses": self.uses,
+            "successes": self.successes,
+            "challenges": self.challenges,
+            "consecutive_challenges": self.consecutive_challenges,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+def _to_cdp_cookie(cookie):
+    """Convert a WebDriver cookie dict to the shape Network.setCookies expects."""
+    converted = {
+        "name": cookie["name"],
+        "value": cookie["value"],
+        "domain": cookie.get("domain", ""),
+        "path": cookie.get("path", "/"),
+        "secure": cookie.get("secure", False),
+        "httpOnly": cookie.get("httpOnly", False),
+    }
+    if "expiry" in cookie:
+        converted["expires"] = cookie["expiry"]
+    if cookie.get("sameSite") in ("Strict", "Lax", "None"):
+        converted["sameSite"] = cookie["sameSite"]
+    return converted
+
+def _owner(driver):
+    """Key of the cookie jar a driver uses; the tabs of one Chrome share theirs."""
+    return id(driver.browser) if isinstance(driver, TabDriver) else id(driver)
+
+class SessionStore:
+    """Persists verified browser sessions and hands them to new drivers.
+
+    Sessions are saved after a successful captcha solve, scored by how often the
+    drivers using them load pages without being challenged, and retired once they
+    are too old or start getting challenged.
+    """
+
+    def __init__(self, directory, max_sessions, max_age, max_consecutive_challenges,
+                 min_success_rate, min_uses_for_rate, persist_interval=0):
+        self.directory = directory
+        self.max_sessions = max_sessions
+        self.max_age = max_age
+        self.max_consecutive_challenges = max_consecutive_challenges
+        self.min_success_rate = min_success_rate
+        self.min_uses_for_rate = min_uses_for_rate
+        self.persist_interval = persist_interval
+        self._sessions = {}
+        self._bindings = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self.counters = {"saved": 0, "applied": 0, "retired": 0}
+
+    def _path(self, session_id):
+        return os.path.join(self.directory, f"{session_id}.json")
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    session = BrowserSession.from_dict(json.load(f))
+                self._sessions[session.id] = session
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"Ignoring unreadable session file {path}: {e}")
+        self._retire_unfit()
+
+    def _persist(self, session):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(session.id)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(session.to_dict(), f)
+        os.replace(path + ".tmp", path)
+        session.persisted_at = time.monotonic()
+        session.dirty = False
+
+    def _is_unfit(self, session):
+        if self.max_age and session.age > self.max_age:
+            return True
+        if session.consecutive_challenges >= self.max_consecutive_challenges:
+            return True
+        return session.uses >= self.min_uses_for_rate and session.success_rate < self.min_success_rate
+
+    def _retire(self, session):
+        self._sessions.pop(session.id, None)
+        self.counters["retired"] += 1
+        try:
+            os.remove(self._path(session.id))
+        except OSError:
+            pass
+        logger.info(f"Retired browser session {session.id} after {session.uses} uses "
+                    f"({session.success_rate:.0%} clean)")
+
+    def _retire_unfit(self):
+        for session in list(self._sessions.values()):
+            if self._is_unfit(session):
+                self._retire(session)
+
+    def save_from_driver(self, driver):
+        """Store the session of a driver that just got past the captcha and bind it."""
+        try:
+            cookies = driver.get_cookies()
+            user_agent = driver.execute_script("return navigator.userAgent")
+        except Exception as e:
+            logger.warning(f"Could not read browser session: {e}")
+            return None
+        session = BrowserSession(cookies, user_agent)
+        with self._lock:
+            self._load()
+            self._sessions[session.id] = session
+            self._bindings[_owner(driver)] = session.id
+            # Keep only the best sessions once over capacity
+            while len(self._sessions) > self.max_sessions:
+                self._retire(min(self._sessions.values(), key=lambda s: (s.success_rate, -s.age)))
+            self.counters["saved"] += 1
+            self._persist(session)
+        logger.info(f"Saved browser session {session.id} with {len(cookies)} cookie(s)")
+        return session
+
+    def apply(self, driver):
+        """Load the best stored session's cookies into a driver; returns the session or None."""
+        with self._lock:
+            self._load()
+            self._retire_unfit()
+            if not self._sessions:
+                return None
+            session = max(self._sessions.values(), key=lambda s: (s.success_rate, -s.age))
+        try:
+            driver.execute_cdp_cmd(
+                "Network.setCookies", {"cookies": [_to_cdp_cookie(c) for c in session.cookies]}
+            )
+        except Exception as e:
+            logger.warning(f"Could not apply browser session {session.id}: {e}")
+            return None
+        with self._lock:
+            self._bindings[_owner(driver)] = session.id
+            self.counters["applied"] += 1
+        logger.info(f"Applied browser session {session.id} to driver")
+        return session
+
+    def record(self, driver, challenged):
+        """Update the score of the session bound to a driver after a page load."""
+        with self._lock:
+            session = self._sessions.get(self._bindings.get(_owner(driver)))
+            if session is None:
+                return
+            session.uses += 1
+            if challenged:
+                session.challenges += 1
+                session.consecutive_challenges += 1
+            else:
+                session.successes += 1
+                session.consecutive_challenges = 0
+            if self._is_unfit(session):
+                self._retire(session)
+                self._bindings.pop(_owner(driver), None)
+            elif session.persisted_at is None or time.monotonic() - session.persisted_at >= self.persist_interval:
+                self._persist(session)
+            else:
+                # Written later, by the next record() past the interval or by flush()
+                session.dirty = True
+
+    def flush(self):
+        """Write the sessions whose scores changed since they were last saved."""
+        with self._lock:
+            for session in self._sessions.values():
+                if session.dirty:
+                    self._persist(session)
+
+    def is_bound(self, driver):
+        with self._lock:
+            return self._bindings.get(_owner(driver)) in self._sessions
+
+    def release(self, driver):
+        """Forget the binding of a driver that has been closed."""
+        if isinstance(driver, TabDriver) and not driver.browser.closed:
+            # Other tabs still use the browser's session
+            return
+        with self._lock:
+            self._bindings.pop(_owner(driver), None)
+
+    def stats(self):
+        with self._lock:
+            self._load()
+            sessions = list(self._sessions.values())
+            return {
+                **self.counters,
+                "active": len(sessions),
+                "bound_drivers": len(self._bindings),
+                "success_rate": round(
+                    sum(s.success_rate for s in sessions) / len(sessions), 4
+                ) if sessions else None,
+            }
+
+session_store = SessionStore(
+    directory=settings.SESSION_STORE_DIR,
+    max_sessions=settings.SESSION_STORE_MAX_SESSIONS,
+    max_age=settings.SESSION_MAX_AGE_MINUTES * 60,
+    max_consecutive_challenges=settings.SESSION_MAX_CONSECUTIVE_CHALLENGES,
+    min_success_rate=settings.SESSION_MIN_SUCCESS_RATE,
+    min_uses_for_rate=settings.SESSION_MIN_USES_FOR_RATE,
+    persist_interval=settings.SESSION_PERSIST_INTERVAL_SECONDS,
+)
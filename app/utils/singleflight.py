@@ -0,0 +1,62 @@
+import asyncio
+import logging
+
+from app.utils.concurrency import Deadline, current_deadline, shared_deadline_scope
+
+logger = logging.getLogger(__name__)
+
+class _Call:
+    __slots__ = ("task", "waiters", "deadline")
+
+    def __init__(self, deadline):
+        self.task = None
+        self.waiters = 0
+        self.deadline = deadline
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one in-flight task.
+
+    Every caller awaiting a key receives the result or exception of the shared
+    task. The task is only cancelled once all of its callers have gone away, and
+    runs until the latest of their request deadlines rather than the first one's.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self.counters = {"executed": 0, "deduplicated": 0}
+
+    def stats(self):
+        return {**self.counters, "in_flight": len(self._calls)}
+
+    async def do(self, key, factory):
+        """Await factory() for key, joining an identical call if one is running."""
+        call = self._calls.get(key)
+        if call is None:
+            self.counters["executed"] += 1
+            call = _Call(Deadline(current_deadline()))
+            call.task = asyncio.ensure_future(self._run(factory, call.deadline))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            self.counters["deduplicated"] += 1
+            call.deadline.extend(current_deadline())
+            logger.debug(f"Joining in-flight call for {key}")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    @staticmethod
+    async def _run(factory, deadline):
+        with shared_deadline_scope(deadline):
+            return await factory()
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
@@ -0,0 +1,264 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from selenium.common.exceptions import TimeoutException
+
+from app.core.config import settings
+from app.utils.concurrency import clamp_timeout, sleep
+from app.utils.network import apply_resource_blocking
+
+logger = logging.getLogger(__name__)
+
+class TabbedBrowser:
+    """One Chrome process whose tabs are shared by concurrent scrapes.
+
+    WebDriver only talks to the focused window, so every command switches to its
+    tab under the browser lock first. Page loads and readiness polling of the
+    other tabs carry on while a command runs; only the commands are serialized.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        # Serializes WebDriver commands; `_state_lock` guards the tab bookkeeping
+        self.lock = threading.RLock()
+        self._state_lock = threading.Lock()
+        self.created_at = time.monotonic()
+        self.handles = set()
+        # Tabs promised by reserve() that open_tab() has not opened yet
+        self.reserved = 0
+        self.retiring = False
+        self.closed = False
+        # Set by get_driver(); a plain attribute of the Chrome driver, not a WebDriver command
+        self.proxy = getattr(driver, "proxy", None)
+        self._spare_handle = driver.current_window_handle
+        self._focused = self._spare_handle
+
+    @property
+    def age(self):
+        return time.monotonic() - self.created_at
+
+    @property
+    def tabs(self):
+        return len(self.handles) + self.reserved
+
+    def reserve(self, limit):
+        """Claim room for one more tab unless the browser has `limit` tabs or is going away."""
+        with self._state_lock:
+            if self.closed or self.retiring or self.tabs >= limit:
+                return False
+            self.reserved += 1
+            return True
+
+    def open_tab(self):
+        """Open a tab reserved with reserve(); None if the browser quit in the meantime."""
+        with self.lock:
+            with self._state_lock:
+                self.reserved -= 1
+                if self.closed:
+                    return None
+                if self._spare_handle is not None:
+                    # The window Chrome started with, or the last tab closed, is reused
+                    handle, self._spare_handle = self._spare_handle, None
+                    self.handles.add(handle)
+                    return TabDriver(self, handle)
+            try:
+                self.driver.switch_to.new_window("tab")
+                handle = self._focused = self.driver.current_window_handle
+            except Exception:
+                self._quit_if_unused()
+                raise
+            with self._state_lock:
+                self.handles.add(handle)
+            try:
+                # Blocked URLs are set per DevTools target, i.e. per tab
+                apply_resource_blocking(self.driver)
+            except Exception as e:
+                logger.warning(f"Could not enable resource blocking in new tab: {e}")
+            return TabDriver(self, handle)
+
+    def _quit_if_unused(self):
+        """Quit the browser if it has no tabs and none are reserved; call it holding `lock`."""
+        with self._state_lock:
+            if self.closed or self.handles or self.reserved:
+                return False
+            self.closed = True
+        self.driver.quit()
+        return True
+
+    @contextmanager
+    def focus(self, handle):
+        """Hold the browser lock with `handle` as the focused window."""
+        with self.lock:
+            if self._focused != handle:
+                self.driver.switch_to.window(handle)
+                self._focused = handle
+            yield self.driver
+
+    def close_tab(self, handle):
+        """Close one tab; the browser quits with its last tab. Returns True if it quit."""
+        with self.lock:
+            with self._state_lock:
+                self.handles.discard(handle)
+                if not self.handles and self.reserved:
+                    # Closing the last window would end Chrome under the tab about to open
+                    self._spare_handle = handle
+                    return False
+            if self._quit_if_unused():
+                return True
+            if self._focused != handle:
+                self.driver.switch_to.window(handle)
+            self.driver.close()
+            self._focused = None
+            return False
+
+class TabDriver:
+    """WebDriver stand-in bound to one tab of a TabbedBrowser.
+
+    Method calls and property reads are forwarded to the shared driver with the
+    tab focused, so scraper code can use it like a dedicated driver.
+    """
+
+    # Per-browser state such as the performance log cannot be attributed to one tab
+    shares_browser = True
+
+    def __init__(self, browser, handle):
+        self._browser = browser
+        self._handle = handle
+
+    @property
+    def browser(self):
+        return self._browser
+
+    @property
+    def proxy(self):
+        # Read without the browser lock; the pool checks it while holding its own
+        return self._browser.proxy
+
+    def __getattr__(self, name):
+        if callable(getattr(type(self._browser.driver), name, None)):
+            def call(*args, **kwargs):
+                with self._browser.focus(self._handle) as driver:
+                    return getattr(driver, name)(*args, **kwargs)
+            return call
+        with self._browser.focus(self._handle) as driver:
+            return getattr(driver, name)
+
+    @contextmanager
+    def exclusive(self):
+        """Keep this tab focused, and the other tabs waiting, for the whole block."""
+        with self._browser.focus(self._handle):
+            yield self
+
+    def get(self, url):
+        """Navigate without holding the browser until the page has loaded.
+
+        Returns once the new document has replaced the old one; readiness is
+        then polled like with a dedicated driver.
+        """
+        with self._browser.focus(self._handle) as driver:
+            driver.execute_script("window.__tabNavigationPending = true")
+            driver.execute_cdp_cmd("Page.navigate", {"url": url})
+        deadline = time.monotonic() + clamp_timeout(settings.PAGE_LOAD_TIMEOUT)
+        while True:
+            try:
+                with self._browser.focus(self._handle) as driver:
+                    pending = driver.execute_script("return window.__tabNavigationPending === true")
+            except Exception as e:
+                # The document may be swapped while the probe runs
+                logger.debug(f"Navigation probe failed: {e}")
+                pending = True
+            if not pending:
+                return
+            if time.monotonic() >= deadline:
+                raise TimeoutException(f"Navigation to {url} did not commit")
+            sleep(settings.PAGE_READY_POLL_INTERVAL)
+
+    def retire_browser(self):
+        """Give the browser no new tabs so it quits once its current tabs are closed."""
+        self._browser.retiring = True
+
+    def quit(self):
+        if self._browser.close_tab(self._handle):
+            logger.info("Closed browser after its last tab")
+
+def exclusive(driver):
+    """Context in which no other tab of the driver's browser may run commands."""
+    return driver.exclusive() if isinstance(driver, TabDriver) else nullcontext(driver)
+
+class TabbedBrowsers:
+    """Hands out tabs, packing up to `tabs_per_browser` of them into each browser.
+
+    Browsers are launched outside the lock, so a cold start does not hold up tabs
+    opening in other browsers. Callers that find no room while browsers are
+    starting wait for those rather than launching more.
+    """
+
+    def __init__(self, launch, tabs_per_browser, max_age_seconds=None, proxy_pool=None):
+        self.launch = launch
+        self.tabs_per_browser = tabs_per_browser
+        self.max_age_seconds = max_age_seconds
+        self.proxy_pool = proxy_pool
+        self._browsers = []
+        self._launching = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+    def open(self):
+        """Open a tab in a browser with room, launching a new browser if none has any."""
+        while True:
+            tab = self._reserve().open_tab()
+            if tab is not None:
+                return tab
+            # The browser quit between the reservation and the new tab
+
+    def _reserve(self):
+        """A browser with a tab reserved for the caller, launching one if needed."""
+        with self._cond:
+            while True:
+                self._browsers = [browser for browser in self._browsers if not browser.closed]
+                for browser in self._browsers:
+                    # Old browsers take no new tabs and quit once their last tab closes
+                    if self.max_age_seconds and browser.age >= self.max_age_seconds:
+                        browser.retiring = True
+                    if self._behind_quarantined_proxy(browser):
+                        browser.retiring = True
+                    if browser.reserve(self.tabs_per_browser):
+                        return browser
+                # Every starting browser has room for its launcher and tabs_per_browser - 1 more
+                if self._waiting >= self._launching * (self.tabs_per_browser - 1):
+                    break
+                self._waiting += 1
+                try:
+                    self._cond.wait()
+                finally:
+                    self._waiting -= 1
+            self._launching += 1
+
+        browser = None
+        try:
+            browser = TabbedBrowser(self.launch())
+            browser.reserved += 1
+            return browser
+        finally:
+            with self._cond:
+                self._launching -= 1
+                if browser is not None:
+                    self._browsers.append(browser)
+                self._cond.notify_all()
+
+    def _behind_quarantined_proxy(self, browser):
+        """Whether a browser's proxy is quarantined while a healthy one could replace it."""
+        proxy = browser.proxy
+        return proxy is not None and proxy.quarantined and self.proxy_pool.has_healthy()
+
+    def stats(self):
+        with self._cond:
+            self._browsers = [browser for browser in self._browsers if not browser.closed]
+            return {
+                "browsers": len(self._browsers),
+                "starting": self._launching,
+                "tabs": sum(len(browser.handles) for browser in self._browsers),
+                "tabs_per_browser": self.tabs_per_browser,
+            }
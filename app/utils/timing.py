@@ -0,0 +1,78 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+# Timer of the scrape running in the current context, if any
+_current_timer = contextvars.ContextVar("stage_timer", default=None)
+
+# Per-request collector of variant timings, shared with the scrape worker threads
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+class StageTimer:
+    """Accumulates wall time spent in named scrape stages, plus plain counters."""
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def as_dict(self):
+        """Return stage durations in seconds, rounded to milliseconds."""
+        return {name: round(seconds, 3) for name, seconds in self.stages.items()}
+
+    def __str__(self):
+        parts = [f"{name}={seconds:.3f}s" for name, seconds in self.stages.items()]
+        parts.extend(f"{name}={value}" for name, value in self.counters.items())
+        return ", ".join(parts)
+
+@contextmanager
+def track_stages():
+    """Install a fresh StageTimer for the current context and yield it."""
+    timer = StageTimer()
+    token = _current_timer.set(timer)
+    try:
+        yield timer
+    finally:
+        _current_timer.reset(token)
+
+@contextmanager
+def stage(name):
+    """Time a stage on the current timer; a no-op when nothing is tracking."""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+    else:
+        with timer.stage(name):
+            yield
+
+def count(name, value=1):
+    """Add to a counter on the current timer; a no-op when nothing is tracking."""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.count(name, value)
+
+@contextmanager
+def collect_request_timings():
+    """Collect the timings reported by scrapes started in this context into a dict."""
+    timings = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+def report_timings(key, timer, **extra):
+    """Publish a finished StageTimer to the request collecting timings, if any."""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[key] = {**timer.as_dict(), **timer.counters, **extra}
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+
+import requests
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.jobs import check_callback_url, job_store
+from app.services.products import get_product
+from app.utils.concurrency import ScrapeCancelled, ScrapeRejected
+from app.utils.driver_pool import driver_pool
+
+logger = logging.getLogger(__name__)
+
+# Captcha, throttling, timeouts and scrape failures (500 wraps browser crashes and
+# pool timeouts); a 404 or a client error would come out the same next time
+TRANSIENT_STATUSES = (403, 429, 500, 502, 503, 504)
+
+def _is_retryable(error):
+    """Only failures another attempt could turn out differently are worth one."""
+    if isinstance(error, HTTPException):
+        return error.status_code in TRANSIENT_STATUSES
+    # Overload and deadlines pass; anything else is a bug that would fail every attempt
+    return isinstance(error, (ScrapeCancelled, ScrapeRejected))
+
+def _send_callback(job):
+    """POST the finished job to its callback URL, retrying a few times."""
+    try:
+        # Checked again: the host may resolve differently than at submission
+        check_callback_url(job["callback_url"])
+    except ValueError as e:
+        logger.warning(f"Not sending callback for job {job['id']}: {e}")
+        return "rejected"
+    for attempt in range(1, settings.JOB_CALLBACK_ATTEMPTS + 1):
+        try:
+            # Redirects could lead anywhere, including private addresses
+            response = requests.post(job["callback_url"], json=job, timeout=settings.JOB_CALLBACK_TIMEOUT,
+                                     allow_redirects=False)
+            response.raise_for_status()
+            return f"delivered ({response.status_code})"
+        except requests.RequestException as e:
+            logger.warning(f"Callback for job {job['id']} failed (attempt {attempt}): {e}")
+    return "failed"
+
+async def _heartbeat(job_id, worker_id):
+    while True:
+        await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+        if not await asyncio.to_thread(job_store.heartbeat, job_id, worker_id):
+            logger.warning(f"Worker {worker_id} lost the lease on job {job_id}")
+            return
+
+async def _run_job(job, worker_id):
+    logger.info(f"Worker {worker_id} running job {job['id']} for product {job['product_id']}")
+    heartbeat = asyncio.create_task(_heartbeat(job["id"], worker_id))
+    try:
+        data = await get_product(job["product_id"], job["variants"])
+        await asyncio.to_thread(job_store.complete, job["id"], worker_id, data)
+    except Exception as e:
+        detail = e.detail if isinstance(e, HTTPException) else str(e)
+        logger.warning(f"Job {job['id']} attempt {job['attempts']} failed: {detail}")
+        await asyncio.to_thread(job_store.fail, job["id"], worker_id, str(detail), _is_retryable(e))
+    finally:
+        heartbeat.cancel()
+
+    finished = await asyncio.to_thread(job_store.get, job["id"])
+    if finished["callback_url"] and finished["status"] in ("succeeded", "failed"):
+        callback_status = await asyncio.to_thread(_send_callback, finished)
+        await asyncio.to_thread(job_store.set_callback_status, job["id"], callback_status)
+
+async def _worker_loop(worker_id, stop):
+    while not stop.is_set():
+        job = await asyncio.to_thread(job_store.claim, worker_id)
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await _run_job(job, worker_id)
+
+def run_worker(worker_id=None):
+    """Consume jobs until SIGTERM/SIGINT; the entry point of each worker process."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+
+    async def main():
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(signum, stop.set)
+        await asyncio.to_thread(driver_pool.start)
+        try:
+            logger.info(f"Job worker {worker_id} started")
+            await _worker_loop(worker_id, stop)
+        finally:
+            await asyncio.to_thread(driver_pool.drain)
+            logger.info(f"Job worker {worker_id} stopped")
+
+    asyncio.run(main())
+
+class WorkerSupervisor:
+    """Starts the job worker processes for the API and respawns ones that die."""
+
+    def __init__(self, processes):
+        self.processes = processes
+        self._context = multiprocessing.get_context("spawn")
+        self._workers = []
+
+    def start(self):
+        for index in range(self.processes):
+            self._workers.append(self._spawn(index))
+
+    def _spawn(self, index):
+        process = self._context.Process(
+            target=run_worker, name=f"job-worker-{index}", daemon=True
+        )
+        process.start()
+        logger.info(f"Started job worker process {process.pid}")
+        return process
+
+    def check(self):
+        """Respawn worker processes that have exited unexpectedly."""
+        for index, process in enumerate(self._workers):
+            if not process.is_alive():
+                logger.warning(f"Job worker process {process.pid} exited with {process.exitcode}, respawning")
+                self._workers[index] = self._spawn(index)
+
+    def alive(self):
+        return sum(1 for process in self._workers if process.is_alive())
+
+    def stop(self, timeout=None):
+        timeout = settings.DRIVER_POOL_DRAIN_TIMEOUT if timeout is None else timeout
+        for process in self._workers:
+            if process.is_alive():
+                process.terminate()
+        for process in self._workers:
+            process.join(timeout)
+            if process.is_alive():
+                process.kill()
+        self._workers = []
+
+worker_supervisor = WorkerSupervisor(settings.JOB_WORKER_PROCESSES)
+
+if __name__ == "__main__":
+    run_worker()
@@ -0,0 +1,81 @@
+"""Micro-benchmark of the GLOBAL_DADA extractor against the pages under files/.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_extractor
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import timeit
+
+from bs4 import BeautifulSoup
+
+from app.utils.extractor import extract_json_data, extract_title
+
+FILES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "files")
+
+def legacy_extract_json_data(html_content):
+    """The regex extractor previously used by the scraper, kept for comparison."""
+    pattern = re.compile(r'<script[^>]*>(.*?window\.__GLOBAL_DADA\s*=.*?)</script>', re.DOTALL)
+    match = pattern.search(html_content)
+    return match.group(1).strip() if match else None
+
+def legacy_title(html_content):
+    soup = BeautifulSoup(html_content, 'html.parser')
+    title_tag = soup.find('title')
+    return title_tag.text if title_tag else "Unknown page"
+
+def synthesize_product_page(template, sku_count=400):
+    """Inject GLOBAL_DADA/INIT_DATA scripts into a saved page to mimic a product page."""
+    skus = [
+        {
+            "skuId": 5000000000000 + i,
+            "specAttrs": f"颜色&gt;规格{i}",
+            "price": f"{10 + i * 0.5:.2f}",
+            "canBookCount": 1000 - i,
+            "saleCount": i * 3,
+        }
+        for i in range(sku_count)
+    ]
+    global_data = {"offerId": 745785638968, "skuModel": {"skuInfoMap": skus}, "title": "示例商品 }{ \"quoted\""}
+    init_data = {"globalData": {"tempModel": {"offerTitle": "示例商品"}}, "data": {"priceTiers": [1, 10, 100]}}
+    script = (
+        "<script>window.__GLOBAL_DADA = " + json.dumps(global_data, ensure_ascii=False) + ";\n"
+        "window.__INIT_DATA = " + json.dumps(init_data, ensure_ascii=False) + ";</script>"
+    )
+    return template.replace("</body>", script + "</body>", 1)
+
+def load_pages():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FILES_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            content = f.read()
+        if content:
+            pages[os.path.basename(path)] = content
+    template = next(iter(pages.values()), "<html><head><title>Product</title></head><body></body></html>")
+    pages["synthesized_product.html"] = synthesize_product_page(template)
+    return pages
+
+def bench(label, func, content, number):
+    seconds = min(timeit.repeat(lambda: func(content), number=number, repeat=5)) / number
+    print(f"  {label:<28} {seconds * 1000:9.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20, help="Calls per timing run")
+    args = parser.parse_args()
+
+    for name, content in load_pages().items():
+        found = extract_json_data(content) is not None
+        print(f"{name} ({len(content) / 1024:.0f} KB, payload {'found' if found else 'missing'})")
+        bench("legacy regex", legacy_extract_json_data, content, args.number)
+        bench("extract_json_data", extract_json_data, content, args.number)
+        if not found:
+            bench("legacy BeautifulSoup title", legacy_title, content, max(args.number // 10, 1))
+            bench("extract_title", extract_title, content, args.number)
+
+if __name__ == "__main__":
+    main()
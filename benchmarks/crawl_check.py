@@ -0,0 +1,144 @@
+"""Check that crawl.py resumes past products the site does not have.
+
+Starts the fake 1688 site with one product missing, then runs crawl.py three times
+in child processes: a first crawl, the same command again, and a --retry-failed
+run. Product pages come over the HTTP fast path; the missing product's 404 page
+falls through to the browser path, served here by stand-in drivers that load
+pages from the fake site instead of Chrome:
+
+    python -m benchmarks.crawl_check
+
+Takes about ten seconds, mostly the retry backoff. Exits non-zero if any check fails.
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+import requests
+from selenium.common.exceptions import WebDriverException
+
+from app.utils.extractor import PAGE_SNAPSHOT_SCRIPT
+from app.utils.readiness import PAGE_STATE_SCRIPT
+from benchmarks.fake_1688 import FakeSite, start_server
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FOUND_IDS = ["1001", "1002"]
+MISSING_ID = "1404"
+
+class FetchingDriver:
+    """Loads pages from the fake site over HTTP and answers the scraper's WebDriver calls."""
+
+    def __init__(self):
+        self.title = ""
+        self.page_source = ""
+        self.current_url = "about:blank"
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def get(self, url):
+        self.current_url = url
+        self.page_source = requests.get(url, timeout=5).text
+        match = re.search(r"<title>(.*?)</title>", self.page_source, re.S)
+        self.title = match.group(1) if match else ""
+
+    def refresh(self):
+        self.get(self.current_url)
+
+    def execute_script(self, script, *args):
+        if script == PAGE_STATE_SCRIPT:
+            return "captcha" if "Captcha Interception" in self.title else "complete"
+        if script == PAGE_SNAPSHOT_SCRIPT:
+            # No JavaScript runs here, so no payload; only pages the fast path could not read get this far
+            return json.dumps({"title": self.title, "payload": {"global_data": None, "init_data": None}})
+        return None
+
+    def find_element(self, *args):
+        raise WebDriverException("no slider in a stand-in driver")
+
+    def get_log(self, name):
+        raise WebDriverException("no performance log")
+
+    def quit(self):
+        pass
+
+def run_crawl_child(argv):
+    """Entry point of the child processes: crawl.py with stand-in drivers."""
+    import crawl
+    from app.utils.driver_pool import driver_pool
+
+    driver_pool._factory = FetchingDriver
+    sys.argv = ["crawl.py", *argv]
+    crawl.main()
+
+def read_codes(path):
+    with open(path, encoding="utf-8") as f:
+        return [(str(item["product_id"]), item["code"]) for item in map(json.loads, f)]
+
+def main():
+    site = FakeSite(missing_ids=[MISSING_ID])
+    server = start_server(site)
+    scratch = tempfile.TemporaryDirectory(prefix="crawl-check-")
+    ids_path = os.path.join(scratch.name, "ids.txt")
+    output = os.path.join(scratch.name, "products.jsonl")
+    with open(ids_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(FOUND_IDS + [MISSING_ID]) + "\n")
+    env = {
+        **os.environ,
+        "PRODUCT_BASE_URL": f"http://127.0.0.1:{server.server_port}/offer",
+        "HTTP_FAST_PATH_REQUIRE_SESSION": "false",
+        "CACHE_ENABLED": "false",
+        "SESSION_STORE_DIR": os.path.join(scratch.name, "sessions"),
+        "ARCHIVE_ENABLED": "false",
+        "RATE_LIMIT_ENABLED": "false",
+        "TRACK_PAGE_BYTES": "false",
+        "DRIVER_POOL_MIN_SIZE": "0",
+        "PAGE_READY_POLL_INTERVAL": "0.01",
+    }
+    failures = []
+
+    def check(name, passed, detail=""):
+        print(f"{'ok  ' if passed else 'FAIL'} {name}{f' ({detail})' if detail else ''}")
+        if not passed:
+            failures.append(name)
+
+    def crawl(*extra):
+        before = dict(site.counters)
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.crawl_check", "--crawl", ids_path, "--output", output,
+             "--variants", "retail", *extra],
+            cwd=ROOT_DIR, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        return {name: site.counters[name] - before[name] for name in before}
+
+    try:
+        requests_made = crawl()
+        codes = read_codes(output)
+        check("the first crawl finds the products and records the missing one as 404",
+              sorted(codes) == sorted([(product_id, 200) for product_id in FOUND_IDS] + [(MISSING_ID, 404)]),
+              codes)
+        check("the missing product reached the browser path", requests_made["not_found"] > 1, requests_made)
+
+        requests_made = crawl()
+        check("running the same command again scrapes nothing",
+              not any(requests_made.values()) and len(read_codes(output)) == len(codes), requests_made)
+
+        requests_made = crawl("--retry-failed")
+        codes = read_codes(output)
+        check("--retry-failed redoes only the missing product",
+              requests_made["product"] == 0 and requests_made["not_found"] > 0
+              and codes[len(FOUND_IDS) + 1:] == [(MISSING_ID, 404)], codes)
+    finally:
+        server.shutdown()
+        scratch.cleanup()
+    print(f"{len(failures)} check(s) failed" if failures else "All checks passed")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--crawl"]:
+        run_crawl_child(sys.argv[2:])
+    else:
+        main()
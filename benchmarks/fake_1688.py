@@ -0,0 +1,184 @@
+"""Local stand-in for detail.1688.com serving product and captcha pages from files/.
+
+Product pages are the saved page with its title replaced and GLOBAL_DADA/INIT_DATA
+scripts injected; a share of requests gets the captcha page instead, as does every
+request over the per-exit rate limit (exits are told apart by the X-Fake-Exit header
+of benchmarks.fake_proxy, else the client address). Products listed as missing get
+a 404 page. Run it on its own and point
+PRODUCT_BASE_URL at it:
+
+    python -m benchmarks.fake_1688 --port 8688 --latency 0.2 --captcha-rate 0.05
+    PRODUCT_BASE_URL=http://127.0.0.1:8688/offer uvicorn app.main:app
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from benchmarks.bench_extractor import FILES_DIR, synthesize_product_page
+
+PRODUCT_PATH = re.compile(r"^/offer/(\d+)\.html$")
+DEFAULT_TEMPLATE = "<html><head><title>Product</title></head><body></body></html>"
+
+def _read_fixture(name):
+    path = os.path.join(FILES_DIR, name)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+class FakeSite:
+    """Pages and behaviour knobs shared by the request handler threads."""
+
+    def __init__(self, latency=0.0, jitter=0.0, captcha_rate=0.0, captcha_page="captcha_fail.html",
+                 template_page="745785638968_retail.html", sku_count=400, seed=None, per_exit_rps=None,
+                 missing_ids=()):
+        self.latency = latency
+        self.jitter = jitter
+        self.captcha_rate = captcha_rate
+        self.per_exit_rps = per_exit_rps
+        self.missing_ids = {str(product_id) for product_id in missing_ids}
+        self._exit_requests = defaultdict(deque)
+        self.captcha_html = _read_fixture(captcha_page) or (
+            "<html><head><title>Captcha Interception</title></head>"
+            "<body><div id=\"nc_1_n1z\"></div></body></html>"
+        )
+        template = _read_fixture(template_page) or DEFAULT_TEMPLATE
+        # The saved pages are captcha pages; give product pages a neutral title
+        self.template = re.sub(r"<title>.*?</title>", "<title>{title}</title>", template, count=1, flags=re.S)
+        self.sku_count = sku_count
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._pages = {}
+        self.counters = {"product": 0, "captcha": 0, "not_found": 0}
+
+    def delay(self):
+        with self._lock:
+            jitter = self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        if self.latency or jitter:
+            time.sleep(max(self.latency + jitter, 0.0))
+
+    def challenge(self, exit_key=None):
+        with self._lock:
+            if self.per_exit_rps:
+                # Requests seen from this exit over the last second
+                now = time.monotonic()
+                seen = self._exit_requests[exit_key]
+                while seen and seen[0] <= now - 1.0:
+                    seen.popleft()
+                seen.append(now)
+                if len(seen) > self.per_exit_rps:
+                    return True
+            return self._random.random() < self.captcha_rate
+
+    def product_page(self, product_id, sk):
+        key = (product_id, sk)
+        with self._lock:
+            page = self._pages.get(key)
+        if page is None:
+            title = f"商品 {product_id} ({sk}) - 阿里巴巴"
+            page = synthesize_product_page(self.template.replace("{title}", title), self.sku_count)
+            page = page.replace("745785638968", product_id).encode("utf-8")
+            with self._lock:
+                self._pages[key] = page
+        return page
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+def make_handler(site):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, cookie=None):
+            self.send_response(status)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            if cookie:
+                self.send_header("Set-Cookie", cookie)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            match = PRODUCT_PATH.match(url.path)
+            if match is None or match.group(1) in site.missing_ids:
+                site.count("not_found")
+                self._send(404, b"<html><head><title>404</title></head><body></body></html>")
+                return
+
+            site.delay()
+            if site.challenge(self.headers.get("X-Fake-Exit") or self.client_address[0]):
+                site.count("captcha")
+                self._send(200, site.captcha_html.encode("utf-8"))
+                return
+
+            site.count("product")
+            sk = parse_qs(url.query).get("sk", ["order"])[0]
+            # A session cookie for the HTTP fast path to harvest
+            self._send(200, site.product_page(match.group(1), sk), cookie="cna=fake-session; Path=/")
+
+        do_HEAD = do_GET
+
+    return Handler
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients that give up mid-response (deadlines, timeouts) are expected here
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+def start_server(site, host="127.0.0.1", port=0):
+    """Serve the fake site from a background thread; returns the server."""
+    server = _Server((host, port), make_handler(site))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-1688", daemon=True).start()
+    return server
+
+def add_site_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every page")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- jitter on the latency")
+    parser.add_argument("--captcha-rate", type=float, default=0.0, help="Share of requests served a captcha")
+    parser.add_argument("--captcha-page", default="captcha_fail.html", help="Captcha fixture under files/")
+    parser.add_argument("--sku-count", type=int, default=400, help="SKUs in each synthesized page")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for latency jitter and captchas")
+    parser.add_argument("--per-exit-rps", type=float, default=None,
+                        help="Serve captchas to exits (proxies) sending more requests per second than this")
+    parser.add_argument("--missing-ids", nargs="+", default=(), help="Product IDs served as 404 pages")
+
+def site_from_args(args):
+    return FakeSite(
+        latency=args.latency, jitter=args.jitter, captcha_rate=args.captcha_rate,
+        captcha_page=args.captcha_page, sku_count=args.sku_count, seed=args.seed,
+        per_exit_rps=args.per_exit_rps, missing_ids=args.missing_ids,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8688)
+    add_site_arguments(parser)
+    args = parser.parse_args()
+
+    server = start_server(site_from_args(args), args.host, args.port)
+    print(f"Serving fake 1688 at http://{args.host}:{server.server_port}/offer")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
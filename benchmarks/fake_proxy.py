@@ -0,0 +1,116 @@
+"""Local stand-in HTTP proxies for exercising the proxy pool against the fake site.
+
+Each proxy forwards plain-HTTP requests, adds latency, can be made to fail a share
+of them with 502, and tags forwarded requests with X-Fake-Exit so the fake site can
+throttle per exit "IP":
+
+    python -m benchmarks.fake_proxy --count 4 --latency 0.05 --failure-rate 0.0
+    PROXY_URLS='["http://127.0.0.1:8701", ...]' uvicorn app.main:app
+"""
+import argparse
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler
+
+from benchmarks.fake_1688 import _Server
+
+# Forward directly; the environment's own proxy settings must not apply here
+_opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+class FakeProxy:
+    """Behaviour knobs and counters of one stand-in proxy."""
+
+    def __init__(self, name, latency=0.0, failure_rate=0.0, seed=None):
+        self.name = name
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters = {"forwarded": 0, "failed": 0}
+
+    def fails(self):
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+            self.counters["failed" if failed else "forwarded"] += 1
+        return failed
+
+def make_handler(proxy):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, headers=()):
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def do_GET(self):
+            if proxy.latency:
+                time.sleep(proxy.latency)
+            if proxy.fails():
+                self._send(502, b"Bad Gateway")
+                return
+            # Proxy requests carry the absolute target URL as their path
+            request = urllib.request.Request(self.path, method=self.command, headers={
+                name: value for name, value in self.headers.items()
+                if name.lower() not in ("host", "proxy-connection", "connection")
+            })
+            request.add_header("X-Fake-Exit", proxy.name)
+            try:
+                with _opener.open(request, timeout=30) as response:
+                    status, headers, body = response.status, response.getheaders(), response.read()
+            except urllib.error.HTTPError as e:
+                status, headers, body = e.code, e.headers.items(), e.read()
+            except OSError:
+                self._send(502, b"Bad Gateway")
+                return
+            self._send(status, body, [
+                (name, value) for name, value in headers
+                if name.lower() not in ("content-length", "connection", "transfer-encoding")
+            ])
+
+        do_HEAD = do_GET
+
+    return Handler
+
+def start_proxy(proxy, host="127.0.0.1", port=0):
+    """Run a stand-in proxy from a background thread; returns the server."""
+    server = _Server((host, port), make_handler(proxy))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=f"fake-proxy-{proxy.name}", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8701, help="Port of the first proxy; the rest follow")
+    parser.add_argument("--count", type=int, default=4, help="Number of proxies to start")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Share of requests answered with 502")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    servers = [
+        start_proxy(FakeProxy(f"proxy-{index}", args.latency, args.failure_rate, args.seed), args.host, args.port + index)
+        for index in range(args.count)
+    ]
+    for server in servers:
+        print(f"Fake proxy at http://{args.host}:{server.server_port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Offline load test of the API against the local fake 1688 server.
+
+Starts benchmarks.fake_1688 in-process, launches the API under uvicorn with
+PRODUCT_BASE_URL pointed at it and scratch cache/job databases, then fires
+concurrent product requests and reports throughput and latency percentiles.
+
+    python -m benchmarks.load_test --requests 200 --concurrency 8 --latency 0.2
+
+--http-only lets the HTTP fast path serve pages without a harvested browser
+session and starts no drivers up front, so it runs on boxes without Chrome.
+--target benchmarks an API that is already running instead of launching one.
+--proxies N routes the API through N local stand-in proxies (--bad-proxies of them
+always fail); combine with --per-exit-rps to see throughput scale with the pool.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.fake_1688 import add_site_arguments, site_from_args, start_server
+from benchmarks.fake_proxy import FakeProxy, start_proxy
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+def api_environment(args, base_url, scratch_dir, proxy_urls=()):
+    """Settings overrides for the API process under test."""
+    env = {
+        "PRODUCT_BASE_URL": base_url,
+        "CACHE_ENABLED": "true" if args.cache else "false",
+        "CACHE_DB_PATH": os.path.join(scratch_dir, "products.sqlite3"),
+        "JOB_DB_PATH": os.path.join(scratch_dir, "jobs.sqlite3"),
+        "JOB_WORKER_PROCESSES": "0",
+        "SESSION_STORE_DIR": os.path.join(scratch_dir, "sessions"),
+        "SCRAPE_MAX_CONCURRENCY": str(args.scrape_concurrency),
+        "RATE_LIMIT_ENABLED": "false" if args.no_rate_limit else "true",
+    }
+    if args.http_only:
+        env.update({"HTTP_FAST_PATH_REQUIRE_SESSION": "false", "DRIVER_POOL_MIN_SIZE": "0"})
+    if proxy_urls:
+        env.update({"PROXY_URLS": json.dumps(list(proxy_urls)), "PROXY_PROBE_URL": base_url})
+    for override in args.env:
+        name, _, value = override.partition("=")
+        env[name] = value
+    return env
+
+def launch_api(port, env):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT_DIR, env={**os.environ, **env},
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 180
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"API exited with {process.returncode} before becoming healthy")
+        try:
+            if requests.get(f"{url}/health", timeout=1).ok:
+                return process, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise SystemExit("API did not become healthy within 180s")
+
+def run_load(url, product_ids, total, concurrency, variants):
+    """Send `total` product requests from `concurrency` threads; returns (results, seconds)."""
+    local = threading.local()
+    params = [("variants", variant) for variant in variants]
+
+    def one(index):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        product_id = product_ids[index % len(product_ids)]
+        started = time.perf_counter()
+        try:
+            response = session.post(f"{url}/api/product/search-by-id/{product_id}", params=params, timeout=300)
+            status = response.status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        return status, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(total)))
+    return results, time.perf_counter() - started
+
+def start_proxies(args):
+    """Start the stand-in proxies; the last --bad-proxies of them fail every request."""
+    proxies = [
+        FakeProxy(f"proxy-{index}", args.proxy_latency,
+                  1.0 if index >= args.proxies - args.bad_proxies else 0.0, args.seed)
+        for index in range(args.proxies)
+    ]
+    urls = [f"http://127.0.0.1:{start_proxy(proxy).server_port}" for proxy in proxies]
+    return proxies, urls
+
+def report(results, elapsed, site=None, stats=None, proxies=()):
+    latencies = [seconds for status, seconds in results if status == 200]
+    statuses = Counter(str(status) for status, _ in results)
+    print(f"requests     {len(results)} in {elapsed:.2f}s")
+    print(f"throughput   {len(results) / elapsed:.2f} req/s ({len(latencies) / elapsed:.2f} ok/s)")
+    print(f"statuses     {dict(sorted(statuses.items()))}")
+    if latencies:
+        print("latency ok   p50 {:.3f}s  p95 {:.3f}s  p99 {:.3f}s  max {:.3f}s".format(
+            percentile(latencies, 0.50), percentile(latencies, 0.95),
+            percentile(latencies, 0.99), max(latencies),
+        ))
+    if site is not None:
+        print(f"fake site    {site.counters}")
+    for proxy in proxies:
+        print(f"{proxy.name:<12} {proxy.counters}")
+    if stats is not None:
+        print(f"api stats    {json.dumps(stats, ensure_ascii=False)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100, help="Total product requests to send")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent client connections")
+    parser.add_argument("--products", type=int, default=50, help="Distinct product IDs to cycle through")
+    parser.add_argument("--variants", nargs="*", default=[], help="Variants to request (default both)")
+    parser.add_argument("--scrape-concurrency", type=int, default=4, help="SCRAPE_MAX_CONCURRENCY of the API")
+    parser.add_argument("--cache", action="store_true", help="Leave the result cache enabled")
+    parser.add_argument("--no-rate-limit", action="store_true", help="Disable the adaptive rate limiter")
+    parser.add_argument("--http-only", action="store_true", help="Serve pages from the fast path without Chrome")
+    parser.add_argument("--env", action="append", default=[], help="Extra NAME=VALUE setting for the API")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the launched API")
+    parser.add_argument("--target", help="Benchmark this running API instead of launching one")
+    parser.add_argument("--proxies", type=int, default=0, help="Stand-in proxies to route the API through")
+    parser.add_argument("--bad-proxies", type=int, default=0, help="How many of the proxies always fail")
+    parser.add_argument("--proxy-latency", type=float, default=0.0, help="Seconds each proxy adds per request")
+    add_site_arguments(parser)
+    args = parser.parse_args()
+
+    site = None
+    process = None
+    proxies = []
+    scratch = tempfile.TemporaryDirectory(prefix="load-test-")
+    try:
+        if args.target:
+            url = args.target.rstrip("/")
+        else:
+            site = site_from_args(args)
+            server = start_server(site)
+            base_url = f"http://127.0.0.1:{server.server_port}/offer"
+            print(f"fake site    {base_url}")
+            proxies, proxy_urls = start_proxies(args)
+            process, url = launch_api(args.port, api_environment(args, base_url, scratch.name, proxy_urls))
+
+        product_ids = random.Random(args.seed).sample(range(600000000000, 700000000000), args.products)
+        results, elapsed = run_load(url, product_ids, args.requests, args.concurrency, args.variants)
+        try:
+            stats = requests.get(f"{url}/api/product/stats", timeout=10).json()
+        except (requests.RequestException, ValueError):
+            stats = None
+        report(results, elapsed, site, stats, proxies)
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(60)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        scratch.cleanup()
+
+if __name__ == "__main__":
+    main()
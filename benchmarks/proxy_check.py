@@ -0,0 +1,125 @@
+"""Check proxy scoring, quarantine and probing against local stand-in proxies.
+
+Starts the fake 1688 site and a few benchmarks.fake_proxy proxies in-process, feeds
+real fetches through an app.utils.proxies.ProxyPool and checks how it reacts:
+
+    python -m benchmarks.proxy_check
+
+Exits non-zero if any check fails.
+"""
+import argparse
+import sys
+import time
+from collections import Counter
+
+import requests
+
+from app.utils.proxies import ProxyPool
+from app.utils.rate_limiter import OUTCOME_CAPTCHA, OUTCOME_FAILED, OUTCOME_OK
+from benchmarks.fake_1688 import FakeSite, start_server
+from benchmarks.fake_proxy import FakeProxy, start_proxy
+
+def fetch(pool, proxy, url):
+    """Fetch url through proxy and record the outcome like the fast path does."""
+    started = time.perf_counter()
+    try:
+        response = requests.get(url, proxies=proxy.requests_proxies, timeout=5)
+    except requests.RequestException:
+        pool.record(proxy, OUTCOME_FAILED)
+        return
+    if response.status_code >= 500:
+        pool.record(proxy, OUTCOME_FAILED)
+    else:
+        pool.record(proxy, OUTCOME_OK, time.perf_counter() - started)
+
+def wait_until(condition, timeout):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+def new_pool(urls, probe_url, quarantine_seconds):
+    return ProxyPool(
+        urls=urls, alpha=0.3, max_consecutive_failures=3, bad_rate=0.8, min_samples=10,
+        quarantine_seconds=quarantine_seconds, max_quarantine_seconds=quarantine_seconds * 4,
+        probe_url=probe_url, probe_timeout=2,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--slow-latency", type=float, default=0.2, help="Latency of the slow proxy")
+    parser.add_argument("--quarantine", type=float, default=0.5, help="Quarantine seconds of the pool")
+    args = parser.parse_args()
+
+    site_server = start_server(FakeSite())
+    base_url = f"http://127.0.0.1:{site_server.server_port}"
+    page_url = f"{base_url}/offer/1.html?sk=order"
+    fast, slow, broken = FakeProxy("fast"), FakeProxy("slow", latency=args.slow_latency), FakeProxy("broken", failure_rate=1.0)
+    servers = {fake.name: start_proxy(fake) for fake in (fast, slow, broken)}
+    urls = {name: f"http://127.0.0.1:{server.server_port}" for name, server in servers.items()}
+    failures = []
+
+    def check(name, passed, detail=""):
+        print(f"{'ok  ' if passed else 'FAIL'} {name}{f' ({detail})' if detail else ''}")
+        if not passed:
+            failures.append(name)
+
+    # Scoring: the fast proxy gets most of the traffic once both are measured
+    pool = new_pool([urls["fast"], urls["slow"]], base_url, args.quarantine)
+    proxy_fast, proxy_slow = pool.proxies
+    for _ in range(5):
+        fetch(pool, proxy_fast, page_url)
+        fetch(pool, proxy_slow, page_url)
+    picks = Counter(pool.select().server for _ in range(2000))
+    share = picks[proxy_fast.server] / 2000
+    check("latency-weighted selection favours the fast proxy", share > 0.7, f"{share:.0%} of picks")
+    for _ in range(3):
+        pool.record(proxy_fast, OUTCOME_CAPTCHA)
+    picks = Counter(pool.select().server for _ in range(2000))
+    check("captchas lower a proxy's share", picks[proxy_fast.server] / 2000 < share,
+          f"{picks[proxy_fast.server] / 2000:.0%} of picks")
+
+    # Captchas are throttling, not breakage; they do not count as consecutive failures
+    pool = new_pool([urls["fast"]], base_url, args.quarantine)
+    proxy = pool.proxies[0]
+    for _ in range(5):
+        pool.record(proxy, OUTCOME_CAPTCHA)
+    check("a few captchas do not quarantine a proxy", not proxy.quarantined,
+          f"consecutive failures {proxy.consecutive_failures}")
+
+    # Quarantine and probing: a broken proxy is taken out, stays out while it fails
+    # its probe and rejoins once it works again
+    pool = new_pool([urls["fast"], urls["broken"]], base_url, args.quarantine)
+    proxy_fast, proxy_broken = pool.proxies
+    for _ in range(3):
+        fetch(pool, proxy_broken, page_url)
+    check("consecutive failures quarantine a proxy", proxy_broken.quarantined)
+    picks = Counter(pool.select().server for _ in range(500))
+    check("quarantined proxies are not selected", picks[proxy_broken.server] == 0)
+    time.sleep(args.quarantine)
+    pool.has_healthy()
+    check("a failed probe keeps the proxy quarantined",
+          wait_until(lambda: pool.counters["probe_failures"] >= 1, 5) and proxy_broken.quarantined)
+    broken.failure_rate = 0.0
+    time.sleep(args.quarantine * 2)
+    pool.has_healthy()
+    check("a passed probe returns the proxy to the pool", wait_until(lambda: not proxy_broken.quarantined, 5),
+          f"{pool.counters['probes']} probe(s)")
+
+    # Everything quarantined: select() still answers and reports no healthy proxy
+    pool = new_pool([urls["broken"]], base_url, args.quarantine * 20)
+    broken.failure_rate = 1.0
+    for _ in range(3):
+        fetch(pool, pool.proxies[0], page_url)
+    check("with every proxy quarantined, select() still returns one and has_healthy() is false",
+          pool.select() is pool.proxies[0] and not pool.has_healthy())
+
+    for server in (site_server, *servers.values()):
+        server.shutdown()
+    print(f"{len(failures)} check(s) failed" if failures else "All checks passed")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Check the statuses and metric labels of failed browser-path scrapes.
+
+Runs scrape_product_data through the real executor, driver pool and retry logic
+with stand-in drivers instead of Chrome, and checks that a page without a payload
+ends as 404 and an unsolvable captcha as 403, both in the raised HTTPException and
+in the variant and captcha metrics:
+
+    python -m benchmarks.status_check
+
+Takes about half a minute, mostly the retry backoff. Exits non-zero if any check fails.
+"""
+import asyncio
+import json
+import os
+import sys
+
+# Browser path only, without stores or throttling that would need a real browser
+os.environ.update({
+    "HTTP_FAST_PATH_ENABLED": "false",
+    "SESSION_STORE_ENABLED": "false",
+    "RATE_LIMIT_ENABLED": "false",
+    "TRACK_PAGE_BYTES": "false",
+    "ARCHIVE_ENABLED": "false",
+    "DRIVER_POOL_MIN_SIZE": "0",
+    "PAGE_READY_POLL_INTERVAL": "0.01",
+})
+
+from fastapi import HTTPException
+from selenium.common.exceptions import WebDriverException
+
+from app.core.config import settings
+from app.services import scraper
+from app.utils.driver_pool import DriverPool
+from app.utils.extractor import PAGE_SNAPSHOT_SCRIPT
+from app.utils.metrics import CAPTCHA_OUTCOMES, VARIANT_RESULTS
+from app.utils.readiness import PAGE_STATE_SCRIPT
+
+class StubDriver:
+    """Answers the scraper's WebDriver calls for a page without a payload, or a captcha page."""
+
+    def __init__(self, page):
+        self.page = page
+        self.title = "Captcha Interception" if page == "captcha" else "Some product"
+        self.page_source = f"<html><head><title>{self.title}</title></head><body></body></html>"
+        self.current_url = "about:blank"
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def get(self, url):
+        self.current_url = url
+
+    def refresh(self):
+        pass
+
+    def execute_script(self, script, *args):
+        if script == PAGE_STATE_SCRIPT:
+            return self.page
+        if script == PAGE_SNAPSHOT_SCRIPT:
+            return json.dumps({"title": self.title, "payload": {"global_data": None, "init_data": None}})
+        return None
+
+    def find_element(self, *args):
+        # The slider never shows up; anything but NoSuchElement ends WebDriverWait at once
+        raise WebDriverException("slider missing")
+
+    def get_log(self, name):
+        raise WebDriverException("no performance log")
+
+    def quit(self):
+        pass
+
+def counter_value(counter, **labels):
+    return counter._values.get(counter._key(labels), 0)
+
+async def scrape_status(page):
+    scraper.driver_pool = DriverPool(
+        min_size=0, max_size=2, max_uses=0, max_age_seconds=0, checkout_timeout=5,
+        drain_timeout=5, factory=lambda: StubDriver(page),
+    )
+    try:
+        await scraper.scrape_product_data("1", ["retail"])
+    except HTTPException as e:
+        return e.status_code, e.detail
+    except Exception as e:
+        return type(e).__name__, str(e)
+    return 200, None
+
+def main():
+    failures = []
+
+    def check(name, passed, detail=""):
+        print(f"{'ok  ' if passed else 'FAIL'} {name}{f' ({detail})' if detail else ''}")
+        if not passed:
+            failures.append(name)
+
+    # scrape_product_data reports 404 once every variant failed; the variant label keeps its own status
+    status = asyncio.run(scrape_status("complete"))
+    check("a page without a payload ends as 404", status[0] == 404, status)
+    check("its variant is recorded as http_404",
+          counter_value(VARIANT_RESULTS, variant="retail", result="http_404") == 1)
+
+    status = asyncio.run(scrape_status("captcha"))
+    check("an unsolvable captcha is not reported as a server error", status[0] == 404, status)
+    check("its variant is recorded as http_403",
+          counter_value(VARIANT_RESULTS, variant="retail", result="http_403") == 1)
+    check("the failed captcha is counted", counter_value(CAPTCHA_OUTCOMES, outcome="failed") >= 1,
+          f"{counter_value(CAPTCHA_OUTCOMES, outcome='failed')} failed, "
+          f"{counter_value(CAPTCHA_OUTCOMES, outcome='challenged')} challenged")
+    check("no variant was recorded as error",
+          counter_value(VARIANT_RESULTS, variant="retail", result="error") == 0)
+
+    scraper.scrape_executor.shutdown()
+    print(f"{len(failures)} check(s) failed" if failures else "All checks passed")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
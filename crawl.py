@@ -0,0 +1,234 @@
+"""Crawl many 1688 products into a JSONL file, resuming where an earlier run stopped.
+
+    python crawl.py ids.jsonl --output products.jsonl [--concurrency 8] [--variants retail]
+    python crawl.py ids.csv --output products.jsonl
+    cat ids.txt | python crawl.py - --output products.jsonl
+
+Input is JSONL (bare IDs or objects with a product_id field), CSV (a product_id
+column, else the first column) or one ID per line. Each finished product is
+appended to the output as one line with its product_id, code, msg and, on
+success, data. Results are checkpointed in <output>.checkpoint, so running the
+same command again skips products that were scraped (200) or not found (404) and
+redoes the rest, such as ones rejected, throttled or timed out; --retry-failed
+also redoes the 404s. A redone product gets a new line, so the last line of a
+product_id is the current one.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import sys
+import time
+
+from app.core.config import settings
+from app.services.batch import scrape_batch
+from app.services.cache import product_cache
+from app.utils.concurrency import scrape_executor
+from app.utils.driver_pool import driver_pool
+from app.utils.encoding import dumps
+
+# Configure logging
+logging.basicConfig(level=logging.INFO,
+                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def _parse_id(value):
+    """Product ID from a JSON value or raw text, or None if it is not one."""
+    if isinstance(value, dict):
+        value = value.get("product_id", value.get("id"))
+    if isinstance(value, bool):
+        return None
+    text = str(value).strip().strip('"')
+    return int(text) if text.isdigit() else None
+
+def _line_ids(lines):
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line[0] in '{["':
+            try:
+                yield _parse_id(json.loads(line)), line
+                continue
+            except json.JSONDecodeError:
+                pass
+        yield _parse_id(line), line
+
+def _csv_ids(f):
+    rows = csv.reader(f)
+    header = next(rows, None)
+    if header is None:
+        return
+    names = [name.strip().lower() for name in header]
+    column = names.index("product_id") if "product_id" in names else 0
+    if _parse_id(header[column]) is not None:
+        # No header row; the first row is data
+        yield _parse_id(header[column]), ",".join(header)
+    for row in rows:
+        if row:
+            yield _parse_id(row[column]) if column < len(row) else None, ",".join(row)
+
+def read_product_ids(path):
+    """Unique product IDs from a JSONL, CSV or plain file, or stdin for '-', in input order."""
+    f = sys.stdin if path == "-" else open(path, encoding="utf-8-sig", newline="")
+    try:
+        entries = _csv_ids(f) if path.lower().endswith(".csv") else _line_ids(f)
+        product_ids = {}
+        for product_id, raw in entries:
+            if product_id is None:
+                logger.warning(f"Skipping input that is not a product ID: {raw[:80]}")
+                continue
+            product_ids[product_id] = None
+        return list(product_ids)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def _repair_tail(path):
+    """Cut a line left half-written by a crash off the end of a JSONL file."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Walk back to the last complete line
+        position = size
+        while position > 0:
+            step = min(65536, position)
+            f.seek(position - step)
+            chunk = f.read(step)
+            index = chunk.rfind(b"\n")
+            if index != -1:
+                f.truncate(position - step + index + 1)
+                return
+            position -= step
+        f.truncate(0)
+
+# Results that another attempt would not change; anything else is retried on resume
+FINAL_CODES = (200, 404)
+
+class Checkpoint:
+    """Append-only record of the product IDs a crawl has finished, with their result codes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.codes = {}
+        _repair_tail(path)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.codes[entry["product_id"]] = entry["code"]
+        self._file = open(path, "a", encoding="utf-8")
+
+    def finished(self, retry_failed=False):
+        final = (200,) if retry_failed else FINAL_CODES
+        return {product_id for product_id, code in self.codes.items() if code in final}
+
+    def record(self, product_id, code):
+        self.codes[product_id] = code
+        self._file.write(json.dumps({"product_id": product_id, "code": code}) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class Progress:
+    """Throughput, ETA and error rate of the running crawl."""
+
+    def __init__(self, total, skipped):
+        self.total = total
+        self.skipped = skipped
+        self.done = 0
+        self.errors = 0
+        self.started = time.monotonic()
+
+    def record(self, code):
+        self.done += 1
+        if code != 200:
+            self.errors += 1
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        finished = self.skipped + self.done
+        left = self.total - finished
+        eta = _format_seconds(left / rate) if rate > 0 else "?"
+        error_rate = self.errors / self.done * 100 if self.done else 0.0
+        return (
+            f"{finished}/{self.total} ({finished / self.total * 100 if self.total else 100:.1f}%) | "
+            f"{rate:.2f}/s | ETA {eta} | errors {error_rate:.1f}% ({self.errors}) | "
+            f"elapsed {_format_seconds(elapsed)}"
+        )
+
+def _format_seconds(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+async def report_progress(progress, interval):
+    interactive = sys.stderr.isatty()
+    while True:
+        await asyncio.sleep(interval)
+        print(("\r" if interactive else "") + progress.summary(), end="" if interactive else "\n",
+              file=sys.stderr, flush=True)
+
+async def run_crawl(args):
+    product_ids = read_product_ids(args.input)
+    checkpoint = Checkpoint(args.checkpoint or f"{args.output}.checkpoint")
+    finished = checkpoint.finished(args.retry_failed)
+    pending = [product_id for product_id in product_ids if product_id not in finished]
+    progress = Progress(len(product_ids), len(product_ids) - len(pending))
+    logger.info(f"{len(product_ids)} product(s), {progress.skipped} already done, {len(pending)} to crawl")
+
+    _repair_tail(args.output)
+    output = open(args.output, "ab")
+    reporter = asyncio.create_task(report_progress(progress, args.progress_interval))
+    try:
+        async for item in scrape_batch(
+            pending, args.variants, concurrency=args.concurrency,
+            max_age=args.max_age, force_refresh=args.force_refresh
+        ):
+            # Output first: a crash in between redoes the product rather than losing it
+            output.write(dumps(item) + b"\n")
+            output.flush()
+            checkpoint.record(item["product_id"], item["code"])
+            progress.record(item["code"])
+    finally:
+        reporter.cancel()
+        output.close()
+        checkpoint.close()
+        if sys.stderr.isatty():
+            print(file=sys.stderr)
+        logger.info(f"Crawl {'finished' if progress.skipped + progress.done == progress.total else 'stopped'}: {progress.summary()}")
+        await asyncio.to_thread(driver_pool.drain)
+        scrape_executor.shutdown()
+        product_cache.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="JSONL, CSV or text file of product IDs, or - for stdin")
+    parser.add_argument("--output", "-o", required=True, help="JSONL file the results are appended to")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=settings.BATCH_CONCURRENCY,
+                        help="Products in flight at once; browsers are capped by SCRAPE_MAX_CONCURRENCY")
+    parser.add_argument("--variants", nargs="+", choices=["retail", "wholesale"])
+    parser.add_argument("--max-age", type=int, help="Oldest cached result to accept, in seconds")
+    parser.add_argument("--force-refresh", action="store_true", help="Scrape even when a cached result exists")
+    parser.add_argument("--retry-failed", action="store_true", help="Also redo products that were not found before")
+    parser.add_argument("--progress-interval", type=float, default=5.0, help="Seconds between progress lines")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run_crawl(args))
+    except KeyboardInterrupt:
+        logger.info("Interrupted; run the same command again to resume")
+
+if __name__ == "__main__":
+    main()
@@ -1,190 +1,71 @@
-import time
-from selenium import webdriver 
-from selenium.webdriver.common.by import By
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import requests
-import re
+"""Watch 1688 products for price, stock and SKU changes.
+
+    python monitor.py add 745785638968 [--variants retail] [--interval 3600]
+    python monitor.py remove 745785638968
+    python monitor.py list
+    python monitor.py run [--once]
+
+`run` re-scrapes due products through the scraper service and appends only the
+deltas to MONITOR_DELTA_PATH (and MONITOR_WEBHOOK_URL when set). Each product's
+re-crawl interval adapts to how often it changes.
+"""
+import argparse
+import asyncio
 import json
 import logging
-from typing import Optional, Dict, Any
-import time
-import random
-from bs4 import BeautifulSoup
-import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.action_chains import ActionChains
+
+from app.services.cache import product_cache
+from app.services.monitor import change_monitor, watch_store
+from app.utils.concurrency import scrape_executor
+from app.utils.driver_pool import driver_pool
 
 # Configure logging
-logging.basicConfig(level=logging.INFO, 
+logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-class ProductRequest(BaseModel):
-    product_id: str
-
-class ErrorResponse(BaseModel):
-    code: int
-    message: str
-
-def solve_captcha(driver):
-    """Attempt to solve the slider captcha."""
-    logger.info("Attempting to solve captcha...")
+async def run_monitor(once=False):
     try:
-        # Wait for the slider to appear
-        slider = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, "nc_1_n1z"))
-        )
-        
-        # Get the slider track
-        slider_track = driver.find_element(By.ID, "nc_1_n1t")
-        track_width = slider_track.size['width']
-        
-        # Move the slider
-        action = ActionChains(driver)
-        action.click_and_hold(slider)
-        
-        # Move with a human-like pattern - slow start, faster middle, slower end
-        steps = 30
-        for i in range(steps):
-            # Simulate human-like movement with slight variations
-            if i < steps // 3:
-                # Slow start
-                move = (track_width / steps) * 2
-            elif i < 2 * (steps // 3):
-                # Faster middle
-                move = (track_width / steps) * 3
-            else:
-                # Slower end
-                move = (track_width / steps) * 2.2
-                
-            # Add some random variation to seem more human-like
-            move += random.uniform(-2, 2)
-            
-            action.move_by_offset(move, random.uniform(-1, 1))
-            time.sleep(random.uniform(0.01, 0.05))  # Random short delay between movements
-        
-        # Release at the end
-        action.release().perform()
-        time.sleep(2)  # Wait for verification to complete
-        
-        # Check if captcha was successfully solved
-        # This is a simple check for the presence of the script tag we need
-        page_source = driver.page_source
-        if "window.__GLOBAL_DADA" in page_source or "window.GLOBAL_DADA" in page_source:
-            logger.info("Captcha solved successfully")
-            return True
+        if once:
+            checked = await change_monitor.run_once()
+            logger.info(f"Checked {checked} product(s): {change_monitor.stats()}")
         else:
-            logger.warning("Captcha may not have been solved correctly")   
-            with open(f"captcha_fail.html", "w", encoding="utf-8") as f:
-                f.write(driver.page_source)
-            return False
-    except Exception as e:
-        logger.error(f"Error solving captcha: {e}")
-        return False
-
-def extract_json_data(html_content):
-    """Extract the JSON data from the script tag."""
-    # Try different patterns since the exact format might vary
-    patterns = [
-        r'window\.GLOBAL_DADA\s*=\s*({.*?});.*?window\.INIT_DATA\s*=\s*({.*?});',
-        r'window\.__GLOBAL_DADA\s*=\s*({.*?});.*?window\.__INIT_DATA\s*=\s*({.*?});',
-        r'window\.GLOBAL_DADA\s*=\s*({.*?});',
-        r'window\.__GLOBAL_DADA\s*=\s*({.*?});'
-    ]
-    
-    for pattern in patterns:
-        matches = re.search(pattern, html_content, re.DOTALL)
-        if matches:
-            if len(matches.groups()) > 1:
-                # We have both GLOBAL_DADA and INIT_DATA
-                try:
-                    global_data = json.loads(matches.group(1))
-                    init_data = json.loads(matches.group(2))
-                    return {
-                        "global_data": global_data,
-                        "init_data": init_data
-                    }
-                except json.JSONDecodeError as e:
-                    logger.warning(f"JSON decode error: {e}")
-                    continue
-            else:
-                # We only have GLOBAL_DADA
-                try:
-                    return {
-                        "global_data": json.loads(matches.group(1)),
-                        "init_data": None
-                    }
-                except json.JSONDecodeError as e:
-                    logger.warning(f"JSON decode error: {e}")
-                    continue
-    
-    logger.warning("Could not extract JSON data from script tag")
-    return None
+            await change_monitor.run()
+    finally:
+        await asyncio.to_thread(driver_pool.drain)
+        scrape_executor.shutdown()
+        product_cache.close()
 
-def fetch_product_data(product_id: str):
-    """Fetch product data from both retail and wholesale endpoints."""
-    base_url = "https://detail.1688.com/offer"
-    urls = {
-        "retail": f"{base_url}/{product_id}.html?sk=order",
-        "wholesale": f"{base_url}/{product_id}.html?sk=consign"
-    }
-    
-    result = {}
-    
-    try:
-        driver = webdriver.Chrome()
-        
-        for url_type, url in urls.items():
-            logger.info(f"Fetching data from {url_type} URL: {url}")
-            
-            driver.get(url)
-            time.sleep(3)  # Initial wait for page to load
-            
-            # Save the page source
-            with open(f"{product_id}_{url_type}.html", "w", encoding="utf-8") as f:
-                f.write(driver.page_source)
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="Watch products")
+    add.add_argument("product_ids", nargs="+")
+    add.add_argument("--variants", nargs="+", choices=["retail", "wholesale"])
+    add.add_argument("--interval", type=float, help="Initial re-crawl interval in seconds")
+    remove = commands.add_parser("remove", help="Stop watching products")
+    remove.add_argument("product_ids", nargs="+")
+    commands.add_parser("list", help="Show the watchlist and its schedule")
+    run = commands.add_parser("run", help="Re-crawl due products and emit deltas")
+    run.add_argument("--once", action="store_true", help="Check what is due now and exit")
+    args = parser.parse_args()
 
-            # Check if we hit a captcha
-            if "Please slide to verify" in driver.page_source:
-                logger.info("Captcha detected. Attempting to solve...")
-                if not solve_captcha(driver):
-                    # If captcha solving fails, try one more time
-                    driver.refresh()
-                    time.sleep(2)
-                    if not solve_captcha(driver):
-                        logger.error("Failed to solve captcha after multiple attempts")
-                        raise HTTPException(status_code=403, detail="Captcha challenge failed")
-            
-            # Extract JSON data from the page
-            page_source = driver.page_source
-            data = extract_json_data(page_source)
-            
-            if not data:
-                soup = BeautifulSoup(page_source, 'html.parser')
-                title_tag = soup.find('title')
-                title = title_tag.text if title_tag else "Unknown page"
-                logger.error(f"Failed to extract data from {url_type}. Page title: {title}")
-                continue
-            
-            result[url_type] = data
-    
-    except Exception as e:
-        logger.exception(f"Error in fetch_product_data: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
+    if args.command == "add":
+        for product_id in args.product_ids:
+            watch_store.add(product_id, args.variants, args.interval)
+        logger.info(f"Watching {len(args.product_ids)} product(s)")
+    elif args.command == "remove":
+        for product_id in args.product_ids:
+            if not watch_store.remove(product_id):
+                logger.warning(f"Product {product_id} was not being watched")
+    elif args.command == "list":
+        for entry in watch_store.entries():
+            print(json.dumps(entry, ensure_ascii=False))
+    else:
         try:
-            if 'driver' in locals() and driver:
-                driver.quit()
-        except Exception as e:
-            logger.error(f"Error closing driver: {e}")
-    
-    if not result:
-        raise HTTPException(status_code=404, detail="Could not fetch product data")
-    
-    return result
+            asyncio.run(run_monitor(args.once))
+        except KeyboardInterrupt:
+            pass
 
-fetch_product_data(745785638968)
\ No newline at end of file
+if __name__ == "__main__":
+    main()